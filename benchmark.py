@@ -0,0 +1,161 @@
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import subprocess
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+import pandas as pd
+
+import genere
+import genere2
+
+# Volumes de commandes benchmarkés (total sur la période)
+SCALES = {"10k": 10_000, "1M": 1_000_000, "10M": 10_000_000}
+BENCHMARK_DIR = os.path.abspath("benchmarks")
+RESULTS_PATH = os.path.join(BENCHMARK_DIR, "results.jsonl")
+START_DATE = datetime(2024, 5, 1)
+DAYS = 30
+STAGES = ["extract_orders", "clean_all_data", "enrich_data", "calculate_daily_metrics", "calculate_monthly_revenue"]
+
+
+def scale_parameters(total_orders, days):
+    """Volumes dérivés du nombre total de commandes"""
+    orders_per_day = max(1, total_orders // days)
+    return {
+        "orders_per_day": orders_per_day,
+        "customers": max(34, total_orders // 50),
+        "products": max(20, min(10_000, total_orders // 1_000)),
+    }
+
+
+def _raw_path(entity, date):
+    """Chemin raw d'une entité (même organisation que l'extraction)"""
+    return f"data/raw_data/{entity}/{date.year}/{date.month}/{date.day}.csv"
+
+
+def generate_dataset(days, params, seed):
+    """
+    Génère la base des commandes et les fichiers raw clients / produits
+    dans le dossier courant (les fichiers Drive sont écrits directement en raw)
+    """
+    from src.dags.common.instrument import stage
+
+    with stage("generate_orders") as record:
+        record["rows_out"] = genere2.generate_orders(
+            "orders.db", start_date=START_DATE, days=days,
+            min_orders=params["orders_per_day"], max_orders=params["orders_per_day"],
+            customers=params["customers"], products=params["products"], seed=seed,
+        )
+    with stage("generate_clients") as record:
+        clients = genere.generate_clients_frame(START_DATE, days, initial_customers=params["customers"],
+                                                new_customers_rate=0, seed=seed + 1)
+        genere.write_daily_files(clients, lambda date: _raw_path("clients", date))
+        record["rows_out"] = clients.shape[0]
+    with stage("generate_products") as record:
+        products = genere.generate_products(START_DATE, days, params["products"], seed=seed + 2)
+        genere.write_daily_files(products, lambda date: _raw_path("products", date))
+        record["rows_out"] = products.shape[0]
+
+
+def run_scale(name, total_orders, days, seed, keep_data=False):
+    """
+    Exécute un benchmark complet dans un processus dédié (pic RSS propre à l'échelle)
+    Retourne les mesures agrégées par étape
+    """
+    from src.dags.common import instrument
+    from src.dags.common.extract import extract_orders
+    from src.dags.common.clean import clean_all_data
+    from src.dags.common.enrich import enrich_data
+    from src.dags.common.metrics import calculate_daily_metrics, calculate_monthly_revenue
+
+    workdir = os.path.join(BENCHMARK_DIR, "work", name)
+    shutil.rmtree(workdir, ignore_errors=True)
+    os.makedirs(workdir)
+    os.chdir(workdir)
+    instrument.STAGE_METRICS_PATH = os.path.join(workdir, "stage_metrics.jsonl")
+
+    params = scale_parameters(total_orders, days)
+    dates = [START_DATE + timedelta(days=offset) for offset in range(days)]
+    with open(os.path.join(workdir, "pipeline.log"), "w", encoding="utf-8") as log, contextlib.redirect_stdout(log):
+        generate_dataset(days, params, seed)
+        for date in dates:
+            extract_orders(date, db_path="orders.db")
+            clean_all_data(date)
+            enrich_data(date)
+            calculate_daily_metrics(date)
+        for month_year in sorted({date.strftime("%Y-%m") for date in dates}):
+            calculate_monthly_revenue(month_year)
+
+    measures = instrument.load_stage_metrics()
+    summary = measures.groupby("stage", sort=False).agg(
+        calls=("wall_s", "size"),
+        wall_s=("wall_s", "sum"),
+        rows_in=("rows_in", "sum"),
+        rows_out=("rows_out", "sum"),
+        bytes_read=("bytes_read", "sum"),
+        bytes_written=("bytes_written", "sum"),
+        peak_rss_mb=("peak_rss_mb", "max"),
+    ).reset_index()
+    summary["rows_per_s"] = (summary[["rows_in", "rows_out"]].max(axis=1) / summary["wall_s"]).round(1)
+    # Les étapes imbriquées (clean_*_data dans clean_all_data) ne sont pas reprises
+    summary = summary[summary["stage"].isin(STAGES) | summary["stage"].str.startswith("generate_")]
+    summary.insert(0, "scale", name)
+
+    os.chdir(BENCHMARK_DIR)
+    if not keep_data:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return summary.to_dict("records")
+
+
+def _version():
+    """Version du code benchmarké (commit git), None hors dépôt"""
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_benchmark(scales, days=DAYS, seed=42, keep_data=False, results_path=RESULTS_PATH):
+    """
+    Benchmark de chaque échelle, chacune dans un processus neuf
+    Les résultats sont ajoutés à results_path (une ligne JSON par étape et par échelle)
+    """
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    version = _version()
+    run_at = datetime.now().isoformat(timespec="seconds")
+    rows = []
+    for name in scales:
+        print(f"⏱️  Benchmark {name} ({SCALES[name]} commandes sur {days} jours)...")
+        started = time.perf_counter()
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            scale_rows = executor.submit(run_scale, name, SCALES[name], days, seed, keep_data).result()
+        print(f"   terminé en {time.perf_counter() - started:.1f}s")
+        rows.extend(scale_rows)
+
+    with open(results_path, "a", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps({"version": version, "run_at": run_at, "days": days, "seed": seed, **row},
+                               default=str) + "\n")
+
+    report = pd.DataFrame(rows)
+    print(report.to_string(index=False))
+    print(f"💾 Résultats ajoutés à {results_path}")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark des étapes du pipeline sur données synthétiques")
+    parser.add_argument("--scales", nargs="+", default=list(SCALES), choices=list(SCALES), help="Échelles à mesurer")
+    parser.add_argument("--days", type=int, default=DAYS, help="Nombre de jours générés")
+    parser.add_argument("--seed", type=int, default=42, help="Graine aléatoire")
+    parser.add_argument("--keep-data", action="store_true", help="Conserver les données générées")
+    args = parser.parse_args(argv)
+    run_benchmark(args.scales, args.days, args.seed, args.keep_data)
+
+
+if __name__ == "__main__":
+    main()
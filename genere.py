@@ -1,50 +1,135 @@
+import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
-import random
+import argparse
 import os
 
-# Paramètres
-start_date = datetime(2024, 5, 1)
-end_date = datetime(2024, 5, 31)
-output_dir = "clients_daily_may2024"
-os.makedirs(output_dir, exist_ok=True)
-
-initial_customers = 20
-next_customer_id = initial_customers + 1
-existing_customers = list(range(1, initial_customers+1))
-
-# Boucle sur chaque jour
-current_date = start_date
-while current_date <= end_date:
-    daily_records = []
-    
-    # Ajouter clients existants (simulation activité)
-    for cid in existing_customers:
-        if random.random() < 0.7:  # 70% chance d'être présent ce jour
-            daily_records.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "customer_id": cid,
-                "firstname": f"Firstname_{cid}",
-                "lastname": f"Lastname_{cid}",
-                "email": f"user{cid}@example.com"
-            })
-    
-    # Ajouter nouveaux clients certains jours
-    if random.random() < 0.3:  # 30% chance d'avoir des nouveaux clients
-        num_new = random.randint(1, 3)
-        for _ in range(num_new):
-            daily_records.append({
-                "date": current_date.strftime("%Y-%m-%d"),
-                "customer_id": next_customer_id,
-                "firstname": f"Firstname_{next_customer_id}",
-                "lastname": f"Lastname_{next_customer_id}",
-                "email": f"user{next_customer_id}@example.com"
-            })
-            existing_customers.append(next_customer_id)
-            next_customer_id += 1
-    
-    # Sauvegarder fichier CSV du jour
-    df_daily = pd.DataFrame(daily_records)
-    df_daily.to_csv(f"{output_dir}/clients_{current_date.strftime('%Y-%m-%d')}.csv", index=False)
-    
-    current_date += timedelta(days=1)
+# Paramètres par défaut (mai 2024, échelle de démonstration)
+START_DATE = datetime(2024, 5, 1)
+DAYS = 31
+OUTPUT_DIR = "clients_daily_may2024"
+PRODUCTS_PATH = "products.csv"
+
+INITIAL_CUSTOMERS = 20
+PRESENCE_RATE = 0.7       # chance qu'un client existant soit présent un jour donné
+NEW_CUSTOMERS_RATE = 0.3  # chance d'avoir des nouveaux clients un jour donné
+MAX_NEW_CUSTOMERS = 3
+
+PRODUCTS = 20
+MAX_STOCK = 50
+
+
+def _prefixed(prefix, ids, suffix=""):
+    """Chaînes prefix + id (+ suffix) construites en une opération vectorisée"""
+    return prefix + pd.Series(ids, dtype="int64").astype(str) + suffix
+
+
+def generate_clients_frame(start_date=START_DATE, days=DAYS, initial_customers=INITIAL_CUSTOMERS,
+                           presence_rate=PRESENCE_RATE, new_customers_rate=NEW_CUSTOMERS_RATE,
+                           max_new_customers=MAX_NEW_CUSTOMERS, seed=None):
+    """
+    Génère les clients de tous les jours dans un seul DataFrame (colonne date)
+    Tirages NumPy par colonne entière ; même graine => mêmes données
+    """
+    rng = np.random.default_rng(seed)
+    # Nouveaux clients de chaque jour, et clients existants avant ce jour
+    new_counts = np.where(rng.random(days) < new_customers_rate,
+                          rng.integers(1, max_new_customers + 1, size=days), 0)
+    existing = initial_customers + np.concatenate([[0], np.cumsum(new_counts)[:-1]])
+
+    # Présence de chaque client existant (un tirage par couple jour x client)
+    presence = rng.random(int(existing.sum())) < presence_rate
+    offsets = np.concatenate([[0], np.cumsum(existing)])
+    daily_ids = []
+    for day in range(days):
+        present = np.flatnonzero(presence[offsets[day]:offsets[day + 1]]) + 1
+        new = np.arange(existing[day] + 1, existing[day] + new_counts[day] + 1)
+        daily_ids.append(np.concatenate([present, new]))
+
+    dates = pd.date_range(start_date, periods=days, freq="D").strftime("%Y-%m-%d")
+    ids = np.concatenate(daily_ids).astype("int64")
+    return pd.DataFrame({
+        "date": np.repeat(dates.to_numpy(), [len(day_ids) for day_ids in daily_ids]),
+        "customer_id": ids,
+        "firstname": _prefixed("Firstname_", ids),
+        "lastname": _prefixed("Lastname_", ids),
+        "email": _prefixed("user", ids, "@example.com"),
+    })
+
+
+def iter_daily_clients(start_date=START_DATE, days=DAYS, **params):
+    """
+    Clients jour par jour : (date, DataFrame), découpés depuis generate_clients_frame
+    """
+    clients = generate_clients_frame(start_date, days, **params)
+    partitions = dict(tuple(clients.groupby("date", sort=False)))
+    columns = list(clients.columns)
+    for offset in range(days):
+        current_date = start_date + timedelta(days=offset)
+        df_daily = partitions.get(current_date.strftime("%Y-%m-%d"))
+        yield current_date, (df_daily.reset_index(drop=True) if df_daily is not None
+                             else pd.DataFrame(columns=columns))
+
+
+def generate_products(start_date=START_DATE, days=DAYS, products=PRODUCTS, max_stock=MAX_STOCK, seed=None):
+    """
+    Génère le fichier products.csv : stock de chaque produit pour chaque jour
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range(start_date, periods=days, freq="D").strftime("%Y-%m-%d").to_numpy()
+    product_ids = np.tile(np.arange(1, products + 1, dtype="int64"), days)
+    return pd.DataFrame({
+        "date": np.repeat(dates, products),
+        "product_id": product_ids,
+        "product_name": _prefixed("Product_", product_ids),
+        "stock": rng.integers(0, max_stock + 1, size=days * products),
+    })
+
+
+def write_daily_files(df, path_for, date_column="date"):
+    """
+    Écrit un DataFrame multi-jours en un fichier par jour (un seul groupby)
+    `path_for(date)` donne le chemin du fichier d'une journée
+    """
+    count = 0
+    for date_str, df_daily in df.groupby(date_column, sort=True):
+        path = path_for(datetime.strptime(date_str, "%Y-%m-%d"))
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        df_daily.to_csv(path, index=False)
+        count += 1
+    return count
+
+
+def generate_clients(output_dir=OUTPUT_DIR, **params):
+    """Écrit un fichier clients_AAAA-MM-JJ.csv par jour dans output_dir"""
+    os.makedirs(output_dir, exist_ok=True)
+    return write_daily_files(
+        generate_clients_frame(**params),
+        lambda date: f"{output_dir}/clients_{date.strftime('%Y-%m-%d')}.csv",
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère les fichiers clients quotidiens et products.csv")
+    parser.add_argument("--start", default=START_DATE.strftime("%Y-%m-%d"), help="Premier jour (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=DAYS, help="Nombre de jours")
+    parser.add_argument("--customers", type=int, default=INITIAL_CUSTOMERS, help="Clients initiaux")
+    parser.add_argument("--products", type=int, default=PRODUCTS, help="Nombre de produits")
+    parser.add_argument("--seed", type=int, default=None, help="Graine aléatoire")
+    parser.add_argument("--output-dir", default=OUTPUT_DIR, help="Dossier des fichiers clients")
+    parser.add_argument("--products-path", default=PRODUCTS_PATH, help="Fichier products.csv")
+    args = parser.parse_args(argv)
+
+    start_date = datetime.strptime(args.start, "%Y-%m-%d")
+    files = generate_clients(args.output_dir, start_date=start_date, days=args.days,
+                             initial_customers=args.customers, seed=args.seed)
+    products = generate_products(start_date, args.days, args.products,
+                                 seed=None if args.seed is None else args.seed + 1)
+    products.to_csv(args.products_path, index=False)
+    print(f"{files} fichiers clients dans {args.output_dir}, {products.shape[0]} lignes dans {args.products_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,72 +1,133 @@
 import sqlite3
-import random
-from datetime import datetime, timedelta
+import argparse
+import numpy as np
+import pandas as pd
+from datetime import datetime
 
-# Base SQLite
+# Paramètres par défaut (mai 2024, échelle de démonstration)
 DB_PATH = "ecommerce_orders_may2024.db"
-conn = sqlite3.connect(DB_PATH)
-cur = conn.cursor()
+START_DATE = datetime(2024, 5, 1)
+DAYS = 31
+MIN_ORDERS = 0   # commandes par jour (tirage uniforme entre MIN et MAX)
+MAX_ORDERS = 30
+CUSTOMERS = 34
+PRODUCTS = 20
+MAX_QUANTITY = 5
+MIN_PRICE, MAX_PRICE = 5, 100
+BATCH_SIZE = 500_000  # lignes générées et insérées par lot
 
-# Supprimer la table si elle existe
-cur.execute("DROP TABLE IF EXISTS ecommerce_orders")
 
-# Créer la table
-cur.execute("""
-CREATE TABLE ecommerce_orders (
-    order_id INTEGER PRIMARY KEY,
-    order_date TEXT,
-    customer_id INTEGER,
-    customer_name TEXT,
-    product_id INTEGER,
-    product_name TEXT,
-    quantity INTEGER,
-    price REAL
-)
-""")
+def create_orders_table(conn):
+    """(Re)crée la table des commandes"""
+    cur = conn.cursor()
+    # Supprimer la table si elle existe
+    cur.execute("DROP TABLE IF EXISTS ecommerce_orders")
+    # Créer la table
+    cur.execute("""
+    CREATE TABLE ecommerce_orders (
+        order_id INTEGER PRIMARY KEY,
+        order_date TEXT,
+        customer_id INTEGER,
+        customer_name TEXT,
+        product_id INTEGER,
+        product_name TEXT,
+        quantity INTEGER,
+        price REAL
+    )
+    """)
 
-# Paramètres
-start_date = datetime(2024, 5, 1)
-end_date = datetime(2024, 5, 31)
-order_id = 1
-orders = []
 
-# Boucle sur chaque jour de mai 2024
-current_date = start_date
-while current_date <= end_date:
-    date_str = current_date.strftime("%Y-%m-%d")
-    
-    # Nombre aléatoire de commandes ce jour (0 à 5)
-    num_orders = random.randint(0, 30)
-    
-    for _ in range(num_orders):
-        # Choisir un client et un produit aléatoires
-        customer_id = random.randint(1, 34)
-        product_id = random.randint(1, 20)
-        
-        quantity = random.randint(1, 5)
-        price = round(random.uniform(5, 100), 2)
-        
-        orders.append((
-            order_id,
-            date_str,
-            customer_id,
-            f"Customer_{customer_id}",
-            product_id,
-            f"Product_{product_id}",
-            quantity,
-            price
-        ))
-        order_id += 1
-    
-    current_date += timedelta(days=1)
+def iter_order_batches(start_date=START_DATE, days=DAYS, min_orders=MIN_ORDERS, max_orders=MAX_ORDERS,
+                       customers=CUSTOMERS, products=PRODUCTS, seed=None, batch_size=BATCH_SIZE):
+    """
+    Génère les commandes par lots de jours complets (~batch_size lignes) :
+    chaque lot est un DataFrame dont les colonnes sont tirées en une fois avec NumPy
+    Même graine => mêmes commandes
+    """
+    rng = np.random.default_rng(seed)
+    # Nombre aléatoire de commandes de chaque jour
+    counts = rng.integers(min_orders, max_orders + 1, size=days)
+    dates = pd.date_range(start_date, periods=days, freq="D").strftime("%Y-%m-%d").to_numpy()
 
-# Insérer les données dans SQLite
-cur.executemany("""
-INSERT INTO ecommerce_orders 
-(order_id, order_date, customer_id, customer_name, product_id, product_name, quantity, price)
-VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-""", orders)
+    order_id = 1
+    day = 0
+    while day < days:
+        # Jours entiers jusqu'à atteindre la taille de lot
+        last = day + 1
+        while last < days and counts[day:last + 1].sum() <= batch_size:
+            last += 1
+        n = int(counts[day:last].sum())
+        customer_ids = rng.integers(1, customers + 1, size=n)
+        product_ids = rng.integers(1, products + 1, size=n)
+        yield pd.DataFrame({
+            "order_id": np.arange(order_id, order_id + n, dtype="int64"),
+            "order_date": np.repeat(dates[day:last], counts[day:last]),
+            "customer_id": customer_ids,
+            "customer_name": "Customer_" + pd.Series(customer_ids).astype(str),
+            "product_id": product_ids,
+            "product_name": "Product_" + pd.Series(product_ids).astype(str),
+            "quantity": rng.integers(1, MAX_QUANTITY + 1, size=n),
+            "price": np.round(rng.uniform(MIN_PRICE, MAX_PRICE, size=n), 2),
+        })
+        order_id += n
+        day = last
 
-conn.commit()
-conn.close()
-print(f"Base SQLite créée avec {len(orders)} commandes pour mai 2024.")
+
+def generate_orders(db_path=DB_PATH, **params):
+    """
+    Crée la base SQLite des commandes en une seule transaction
+    (WAL, synchronous=OFF, insertions par lots executemany)
+    Retourne le nombre de commandes
+    """
+    conn = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=OFF")
+        create_orders_table(conn)
+        total = 0
+        conn.execute("BEGIN")
+        for batch in iter_order_batches(**params):
+            # Insérer les données dans SQLite (colonnes converties en types Python natifs)
+            conn.executemany("""
+            INSERT INTO ecommerce_orders
+            (order_id, order_date, customer_id, customer_name, product_id, product_name, quantity, price)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, zip(*(batch[col].tolist() for col in batch.columns)))
+            total += batch.shape[0]
+        conn.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Génère la base SQLite des commandes")
+    parser.add_argument("--db-path", default=DB_PATH, help="Base SQLite à (re)créer")
+    parser.add_argument("--start", default=START_DATE.strftime("%Y-%m-%d"), help="Premier jour (YYYY-MM-DD)")
+    parser.add_argument("--days", type=int, default=DAYS, help="Nombre de jours")
+    parser.add_argument("--min-orders", type=int, default=MIN_ORDERS, help="Commandes minimum par jour")
+    parser.add_argument("--max-orders", type=int, default=MAX_ORDERS, help="Commandes maximum par jour")
+    parser.add_argument("--customers", type=int, default=CUSTOMERS, help="Nombre de clients")
+    parser.add_argument("--products", type=int, default=PRODUCTS, help="Nombre de produits")
+    parser.add_argument("--seed", type=int, default=None, help="Graine aléatoire")
+    args = parser.parse_args(argv)
+
+    total = generate_orders(
+        args.db_path,
+        start_date=datetime.strptime(args.start, "%Y-%m-%d"),
+        days=args.days,
+        min_orders=args.min_orders,
+        max_orders=args.max_orders,
+        customers=args.customers,
+        products=args.products,
+        seed=args.seed,
+    )
+    print(f"Base SQLite créée avec {total} commandes ({args.days} jours à partir du {args.start}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import contextlib
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import pandas as pd
+from .clean import clean_all_data
+from .enrich import enrich_data
+from .metrics import calculate_daily_metrics, calculate_monthly_revenue
+from .dimensions import build_customer_dimension, build_product_dimension
+
+# Rattrapage parallèle clean -> enrich -> métriques quotidiennes, un processus par jour
+BACKFILL_WORKERS = os.cpu_count() or 1
+BACKFILL_LOG_DIR = os.path.join("data", "logs", "backfill")
+
+
+def _day_log(date_str):
+    """Journal isolé d'une journée (sorties des étapes)"""
+    os.makedirs(BACKFILL_LOG_DIR, exist_ok=True)
+    return open(os.path.join(BACKFILL_LOG_DIR, f"{date_str}.log"), "a", encoding="utf-8")
+
+
+def _run_stages(date_str, stages):
+    """
+    Exécute des étapes (nom, fonction(date)) pour une journée dans un processus
+    Retourne {date, status, <étape>_s, ...} ; la sortie standard va dans le journal du jour
+    """
+    date = datetime.strptime(date_str, '%Y-%m-%d')
+    row = {'date': date_str, 'status': 'ok'}
+    with _day_log(date_str) as log, contextlib.redirect_stdout(log):
+        for name, func in stages:
+            start = time.perf_counter()
+            try:
+                result = func(date)
+            except Exception as e:
+                row['status'] = f"erreur {name}: {e}"
+                print(f"❌ {name} {date_str}: {e}")
+                return row
+            finally:
+                row[f"{name}_s"] = round(time.perf_counter() - start, 3)
+            if not result:
+                row['status'] = f"incomplet ({name})"
+                return row
+            if name == 'metrics':
+                row['daily_revenue'] = result.get('daily_revenue')
+    return row
+
+
+def _clean_day(date_str):
+    """Phase 1 : nettoyage d'une journée"""
+    return _run_stages(date_str, [('clean', clean_all_data)])
+
+
+def _enrich_day(date_str):
+    """Phase 2 : enrichissement et métriques quotidiennes d'une journée"""
+    return _run_stages(date_str, [('enrich', enrich_data), ('metrics', calculate_daily_metrics)])
+
+
+def _map_days(func, days, workers):
+    """Applique func à chaque journée dans le pool de processus {date: ligne}"""
+    rows = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(func, day): day for day in days}
+        for future in as_completed(futures):
+            day = futures[future]
+            try:
+                rows[day] = future.result()
+            except Exception as e:
+                rows[day] = {'date': day, 'status': f"erreur processus: {e}"}
+    return rows
+
+
+def run_backfill(start, end, workers=None):
+    """
+    Rattrape toutes les journées de [start, end] :
+    1. nettoyage en parallèle
+    2. mise à jour des dimensions (une seule fois, dans le processus principal)
+    3. enrichissement + métriques en parallèle (dimensions en lecture seule)
+    4. métriques mensuelles des mois couverts
+    Retourne le tableau {date, status, durées par étape} trié par date
+    """
+    if start > end:
+        raise ValueError(f"Période vide : {start:%Y-%m-%d} est postérieur à {end:%Y-%m-%d}")
+    workers = workers or BACKFILL_WORKERS
+    days = []
+    day = start
+    while day <= end:
+        days.append(day.strftime('%Y-%m-%d'))
+        day += timedelta(days=1)
+    print(f"Rattrapage de {len(days)} jours ({days[0]} - {days[-1]}) sur {workers} processus")
+
+    started = time.perf_counter()
+    cleaned = _map_days(_clean_day, days, workers)
+
+    # Les dimensions partagées ne sont écrites qu'ici, jamais par deux processus à la fois
+    build_customer_dimension()
+    build_product_dimension()
+
+    ready = [day for day in days if cleaned[day]['status'] == 'ok']
+    enriched = _map_days(_enrich_day, ready, workers)
+
+    rows = []
+    for day in days:
+        row = dict(cleaned[day])
+        if day in enriched:
+            row.update(enriched[day])
+        rows.append(row)
+    report = pd.DataFrame(rows)
+    stage_columns = [col for col in ('clean_s', 'enrich_s', 'metrics_s') if col in report.columns]
+    report['total_s'] = report[stage_columns].sum(axis=1).round(3)
+
+    for month_year in sorted({day[:7] for day in ready}):
+        with _day_log(f"{month_year}-monthly") as log, contextlib.redirect_stdout(log):
+            calculate_monthly_revenue(month_year)
+
+    elapsed = time.perf_counter() - started
+    print(report.to_string(index=False))
+    ok = int((report['status'] == 'ok').sum())
+    print(f"✅ {ok}/{len(days)} jours traités en {elapsed:.1f}s (journaux: {BACKFILL_LOG_DIR})")
+    return report
+
+
+def main(argv=None):
+    """Ligne de commande : python -m src.dags.common.backfill 2024-05-01 2024-05-31 --workers 4"""
+    parser = argparse.ArgumentParser(description="Rattrapage parallèle clean -> enrich -> métriques")
+    parser.add_argument("start", help="Première date (YYYY-MM-DD)")
+    parser.add_argument("end", help="Dernière date incluse (YYYY-MM-DD)")
+    parser.add_argument("--workers", type=int, default=BACKFILL_WORKERS, help="Nombre de processus")
+    args = parser.parse_args(argv)
+    try:
+        start = datetime.strptime(args.start, '%Y-%m-%d')
+        end = datetime.strptime(args.end, '%Y-%m-%d')
+    except ValueError as e:
+        parser.error(f"date invalide : {e}")
+    if start > end:
+        parser.error(f"période vide : la date de début {args.start} est postérieure à la date de fin {args.end}")
+    report = run_backfill(start, end, args.workers)
+    return 0 if (report['status'] == 'ok').all() else 1
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -1,7 +1,11 @@
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+from .storage import write_table
+from .rules import apply_rules, REJECT_REASON_COLUMN
+from .dtypes import apply_dtype_plan, read_csv_planned
+from .instrument import instrumented, mark_failed
 
 def ensure_directory_exists(file_path):
     """Crée automatiquement le dossier s'il n'existe pas"""
@@ -11,156 +15,303 @@ def ensure_directory_exists(file_path):
         print(f"Dossier créé: {directory}")
     return file_path
 
-def clean_clients_data(date):
+def raw_data_path(entity, date):
+    """Chemin du fichier raw d'une entité pour une date"""
+    return f"data/raw_data/{entity}/{date.year}/{date.month}/{date.day}.csv"
+
+def clean_data_path(entity, date):
+    """Chemin (format CSV de référence) du fichier nettoyé d'une entité"""
+    return f"data/clean_data/{entity}/{date.year}/{date.month}/{date.day}.csv"
+
+# Colonnes numériques converties en une seule passe
+PRODUCT_NUMERIC_COLUMNS = ['product_id', 'stock']
+ORDER_NUMERIC_COLUMNS = ['order_id', 'customer_id', 'product_id', 'quantity', 'price']
+
+# Colonne technique ajoutée au nettoyage multi-jours
+BATCH_DATE_COLUMN = '_batch_date'
+
+# Lignes rejetées conservées en quarantaine plutôt que supprimées silencieusement
+QUARANTINE_ENABLED = os.environ.get("ECOMMERCE_QUARANTINE", "1") != "0"
+
+def quarantine_path(entity, date):
+    """Chemin (format CSV de référence) du fichier de quarantaine d'une entité"""
+    return f"data/quarantine/{entity}/{date.year}/{date.month}/{date.day}.csv"
+
+def report_rejects(entity, date, rejected, counts):
+    """
+    Affiche les rejets par règle et écrit les lignes rejetées en quarantaine
+    """
+    lost = {rule: n for rule, n in counts.items() if n}
+    if lost:
+        print(f"Rejets {entity} {date:%Y-%m-%d}: {lost}")
+    if QUARANTINE_ENABLED and not rejected.empty:
+        path = ensure_directory_exists(quarantine_path(entity, date))
+        path = write_table(rejected.drop(columns=BATCH_DATE_COLUMN, errors='ignore'), path)
+        print(f"{rejected.shape[0]} lignes {entity} en quarantaine : {path}")
+
+def _coerce_numeric(df, columns):
+    """Conversion numérique combinée des colonnes présentes"""
+    columns = [col for col in columns if col in df.columns]
+    if columns:
+        df[columns] = df[columns].apply(pd.to_numeric, errors='coerce')
+    return df
+
+def _raw_rejects(raw, rejected):
+    """
+    Lignes rejetées telles que reçues (valeurs d'origine, avant conversions),
+    avec leur motif de rejet
+    """
+    if rejected.empty or not raw.index.is_unique:
+        return rejected
+    return raw.loc[rejected.index].assign(**{REJECT_REASON_COLUMN: rejected[REJECT_REASON_COLUMN]})
+
+def _drop_duplicates(df):
+    """Supprime les doublons et retourne le nombre de lignes retirées"""
+    n_rows = df.shape[0]
+    df = df.drop_duplicates()
+    return df, n_rows - df.shape[0]
+
+def clean_clients_frame(df, return_rejects=False):
+    """
+    Règles de nettoyage des clients, appliquées à un DataFrame en mémoire
+    return_rejects => retourne aussi (lignes rejetées, rejets par règle)
+    """
+    raw = df
+    # Nettoyage
+    df, duplicates = _drop_duplicates(df)
+    
+    # Nettoyage des colonnes textuelles
+    if 'email' in df.columns:
+        df['email'] = df['email'].str.lower().str.strip()
+    if 'firstname' in df.columns:
+        df['firstname'] = df['firstname'].str.title().str.strip()
+    if 'lastname' in df.columns:
+        df['lastname'] = df['lastname'].str.upper().str.strip()
+    
+    # Validation (emails, IDs) : règles du registre en une seule passe
+    df, rejected, counts = apply_rules('clients', df)
+    
+    if 'customer_id' in df.columns:
+        df['customer_id'] = df['customer_id'].astype(int)
+    
+    df = apply_dtype_plan(df, 'clients')
+    
+    if return_rejects:
+        return df, _raw_rejects(raw, rejected), {'doublon': duplicates, **counts}
+    return df
+
+def clean_products_frame(df, return_rejects=False):
+    """
+    Règles de nettoyage des produits, appliquées à un DataFrame en mémoire
+    return_rejects => retourne aussi (lignes rejetées, rejets par règle)
+    """
+    raw = df
+    # Nettoyage
+    df, duplicates = _drop_duplicates(df)
+    
+    # Conversion des types numériques
+    df = _coerce_numeric(df, PRODUCT_NUMERIC_COLUMNS)
+    
+    # NaN et stock négatif : règles du registre en une seule passe
+    df, rejected, counts = apply_rules('products', df)
+    
+    # Nettoyage des noms de produits
+    if 'product_name' in df.columns:
+        df['product_name'] = df['product_name'].str.strip()
+    
+    df = apply_dtype_plan(df, 'products')
+    
+    if return_rejects:
+        return df, _raw_rejects(raw, rejected), {'doublon': duplicates, **counts}
+    return df
+
+def clean_orders_frame(df, return_rejects=False):
+    """
+    Règles de nettoyage des commandes, appliquées à un DataFrame en mémoire
+    return_rejects => retourne aussi (lignes rejetées, rejets par règle)
+    """
+    raw = df
+    # Nettoyage
+    df, duplicates = _drop_duplicates(df)
+    
+    # Conversion des types
+    df = _coerce_numeric(df, ORDER_NUMERIC_COLUMNS)
+    
+    # Gestion des dates
+    if 'order_date' in df.columns:
+        df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
+    
+    # Valeurs manquantes, quantité et prix positifs : règles du registre en une seule passe
+    df, rejected, counts = apply_rules('orders', df)
+    
+    # Nettoyage des colonnes textuelles
+    if 'customer_name' in df.columns:
+        df['customer_name'] = df['customer_name'].str.strip()
+    if 'product_name' in df.columns:
+        df['product_name'] = df['product_name'].str.strip()
+    
+    df = apply_dtype_plan(df, 'orders')
+    
+    if return_rejects:
+        return df, _raw_rejects(raw, rejected), {'doublon': duplicates, **counts}
+    return df
+
+CLEANERS = {
+    'clients': clean_clients_frame,
+    'products': clean_products_frame,
+    'orders': clean_orders_frame,
+}
+
+@instrumented()
+def clean_clients_data(date, raise_errors=False):
     """
     Nettoie les données clients - création automatique des dossiers
+    raise_errors => les erreurs sont propagées au lieu de retourner un DataFrame vide
     """
     try:
         # Lecture
-        raw_path = f"data/raw_data/clients/{date.year}/{date.month}/{date.day}.csv"
+        raw_path = raw_data_path('clients', date)
         if not os.path.exists(raw_path):
             print(f"Aucune donnée client à nettoyer pour {date}")
             return pd.DataFrame()
         
-        df = pd.read_csv(raw_path)
-        
-        # Nettoyage
-        df = df.drop_duplicates()
-        
-        # Nettoyage des colonnes textuelles
-        if 'email' in df.columns:
-            df['email'] = df['email'].str.lower().str.strip()
-        if 'firstname' in df.columns:
-            df['firstname'] = df['firstname'].str.title().str.strip()
-        if 'lastname' in df.columns:
-            df['lastname'] = df['lastname'].str.upper().str.strip()
-        
-        # Validation emails si la colonne existe
-        if 'email' in df.columns:
-            df = df[df['email'].str.contains('@', na=False)]
-        
-        # Validation des IDs
-        if 'customer_id' in df.columns:
-            df = df[df['customer_id'].notna()]
-            df['customer_id'] = df['customer_id'].astype(int)
+        df, rejected, counts = clean_clients_frame(read_csv_planned(raw_path, 'clients', raw=True), return_rejects=True)
+        report_rejects('clients', date, rejected, counts)
         
         # Sauvegarde avec création automatique du dossier
-        clean_path = ensure_directory_exists(
-            f"data/clean_data/clients/{date.year}/{date.month}/{date.day}.csv"
-        )
-        df.to_csv(clean_path, index=False)
+        clean_path = ensure_directory_exists(clean_data_path('clients', date))
+        clean_path = write_table(df, clean_path, 'clients')
         
         print(f"Clients nettoyés : {clean_path}")
         return df
         
     except Exception as e:
         print(f"Erreur nettoyage clients: {e}")
+        mark_failed(e)
+        if raise_errors:
+            raise
         return pd.DataFrame()
 
-def clean_products_data(date):
+@instrumented()
+def clean_products_data(date, raise_errors=False):
     """
     Nettoie les données produits - création automatique des dossiers
+    raise_errors => les erreurs sont propagées au lieu de retourner un DataFrame vide
     """
     try:
-        raw_path = f"data/raw_data/products/{date.year}/{date.month}/{date.day}.csv"
+        raw_path = raw_data_path('products', date)
         if not os.path.exists(raw_path):
             print(f"Aucune donnée produit à nettoyer pour {date}")
             return pd.DataFrame()
         
-        df = pd.read_csv(raw_path)
-        
-        # Nettoyage
-        df = df.drop_duplicates()
-        
-        # Conversion des types numériques
-        if 'product_id' in df.columns:
-            df['product_id'] = pd.to_numeric(df['product_id'], errors='coerce')
-        if 'stock' in df.columns:  # Votre colonne s'appelle 'stock'
-            df['stock'] = pd.to_numeric(df['stock'], errors='coerce')
-        
-        # Supprimer valeurs aberrantes et NaN
-        df = df.dropna()
-        
-        # Validation des valeurs
-        if 'stock' in df.columns:
-            df = df[df['stock'] >= 0]  # Stock ne peut pas être négatif
-        
-        # Nettoyage des noms de produits
-        if 'product_name' in df.columns:
-            df['product_name'] = df['product_name'].str.strip()
+        df, rejected, counts = clean_products_frame(read_csv_planned(raw_path, 'products', raw=True), return_rejects=True)
+        report_rejects('products', date, rejected, counts)
         
         # Sauvegarde avec création automatique du dossier
-        clean_path = ensure_directory_exists(
-            f"data/clean_data/products/{date.year}/{date.month}/{date.day}.csv"
-        )
-        df.to_csv(clean_path, index=False)
+        clean_path = ensure_directory_exists(clean_data_path('products', date))
+        clean_path = write_table(df, clean_path, 'products')
         
         print(f"Produits nettoyés : {clean_path}")
         return df
         
     except Exception as e:
         print(f"Erreur nettoyage produits: {e}")
+        mark_failed(e)
+        if raise_errors:
+            raise
         return pd.DataFrame()
 
-def clean_orders_data(date):
+@instrumented()
+def clean_orders_data(date, raise_errors=False):
     """
     Nettoie les données commandes - création automatique des dossiers
+    raise_errors => les erreurs sont propagées au lieu de retourner un DataFrame vide
     """
     try:
-        raw_path = f"data/raw_data/orders/{date.year}/{date.month}/{date.day}.csv"
+        raw_path = raw_data_path('orders', date)
         if not os.path.exists(raw_path):
             print(f"Aucune donnée commande à nettoyer pour {date}")
             return pd.DataFrame()
         
-        df = pd.read_csv(raw_path)
-        
-        # Nettoyage
-        df = df.drop_duplicates()
-        
-        # Conversion des types
-        if 'order_id' in df.columns:
-            df['order_id'] = pd.to_numeric(df['order_id'], errors='coerce')
-        if 'customer_id' in df.columns:
-            df['customer_id'] = pd.to_numeric(df['customer_id'], errors='coerce')
-        if 'product_id' in df.columns:
-            df['product_id'] = pd.to_numeric(df['product_id'], errors='coerce')
-        if 'quantity' in df.columns:
-            df['quantity'] = pd.to_numeric(df['quantity'], errors='coerce')
-        if 'price' in df.columns:
-            df['price'] = pd.to_numeric(df['price'], errors='coerce')
-        
-        # Gestion des dates
-        if 'order_date' in df.columns:
-            df['order_date'] = pd.to_datetime(df['order_date'], errors='coerce')
-        
-        # Supprimer les lignes avec des valeurs manquantes
-        df = df.dropna()
-        
-        # Validation des valeurs
-        if 'quantity' in df.columns:
-            df = df[df['quantity'] > 0]  # Quantité doit être positive
-        if 'price' in df.columns:
-            df = df[df['price'] > 0]     # Prix doit être positif
-        
-        # Nettoyage des colonnes textuelles
-        if 'customer_name' in df.columns:
-            df['customer_name'] = df['customer_name'].str.strip()
-        if 'product_name' in df.columns:
-            df['product_name'] = df['product_name'].str.strip()
+        df, rejected, counts = clean_orders_frame(read_csv_planned(raw_path, 'orders', raw=True), return_rejects=True)
+        report_rejects('orders', date, rejected, counts)
         
         # Sauvegarde avec création automatique du dossier
-        clean_path = ensure_directory_exists(
-            f"data/clean_data/orders/{date.year}/{date.month}/{date.day}.csv"
-        )
-        df.to_csv(clean_path, index=False)
+        clean_path = ensure_directory_exists(clean_data_path('orders', date))
+        clean_path = write_table(df, clean_path, 'orders')
         
         print(f"Commandes nettoyées : {clean_path}")
         return df
         
     except Exception as e:
         print(f"Erreur nettoyage commandes: {e}")
+        mark_failed(e)
+        if raise_errors:
+            raise
+        return pd.DataFrame()
+
+def load_raw_range(entity, start, end):
+    """
+    Charge tous les fichiers raw d'une entité sur [start, end] dans un seul
+    DataFrame, chaque ligne étant marquée avec sa date (BATCH_DATE_COLUMN)
+    """
+    frames = []
+    day = start
+    while day <= end:
+        raw_path = raw_data_path(entity, day)
+        if os.path.exists(raw_path):
+            df_day = read_csv_planned(raw_path, entity, raw=True)
+            df_day[BATCH_DATE_COLUMN] = day.strftime('%Y-%m-%d')
+            frames.append(df_day)
+        day += timedelta(days=1)
+    
+    if not frames:
         return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+@instrumented()
+def clean_data_range(start, end, entities=None):
+    """
+    Nettoie en une seule passe vectorisée tous les jours de [start, end]
+    puis écrit un fichier nettoyé par jour
+    Retourne {entité: DataFrame nettoyé multi-jours}
+    """
+    results = {}
+    for entity in entities or list(CLEANERS):
+        try:
+            df = load_raw_range(entity, start, end)
+            if df.empty:
+                print(f"Aucune donnée {entity} à nettoyer entre {start} et {end}")
+                continue
+            
+            loaded_days = df[BATCH_DATE_COLUMN].unique().tolist()
+            cleaned, rejected, counts = CLEANERS[entity](df, return_rejects=True)
+            
+            # Découpage par jour ; un jour entièrement rejeté garde un fichier vide
+            partitions = dict(tuple(cleaned.groupby(BATCH_DATE_COLUMN, sort=True)))
+            for date_str in loaded_days:
+                df_day = partitions.get(date_str, cleaned.iloc[0:0])
+                day = datetime.strptime(date_str, '%Y-%m-%d')
+                clean_path = ensure_directory_exists(clean_data_path(entity, day))
+                write_table(df_day.drop(columns=BATCH_DATE_COLUMN), clean_path, entity)
+            
+            # Quarantaine par jour, compteurs de rejets pour toute la période
+            lost = {rule: n for rule, n in counts.items() if n}
+            if lost:
+                print(f"Rejets {entity} {start:%Y-%m-%d} - {end:%Y-%m-%d}: {lost}")
+            for date_str, rejected_day in rejected.groupby(BATCH_DATE_COLUMN, sort=True):
+                report_rejects(entity, datetime.strptime(date_str, '%Y-%m-%d'), rejected_day, {})
+            
+            results[entity] = cleaned.drop(columns=BATCH_DATE_COLUMN)
+            print(f"{entity} nettoyés: {cleaned.shape[0]} lignes sur {len(loaded_days)} jours")
+        
+        except Exception as e:
+            print(f"Erreur nettoyage {entity} ({start} - {end}): {e}")
+            mark_failed(e)
+    
+    return results
 
+@instrumented()
 def clean_all_data(date):
     """
     Nettoie toutes les données pour une date donnée
@@ -0,0 +1,146 @@
+import os
+import numpy as np
+import pandas as pd
+from .storage import read_table, table_exists, write_table, list_tables
+
+# Cube quotidien pré-agrégé, écrit une fois par l'enrichissement
+# Une ligne par (dimension, key) :
+#   'total'    : key = 0, totaux du jour (stock et clients inclus)
+#   'product'  : key = product_id (stock du produit, même sans vente)
+#   'customer' : key = customer_id
+CUBE_DIR = os.path.join("data", "cube")
+# Ligne 'total' seule, écrite à côté du cube : lecture d'une ligne pour les métriques du jour
+CUBE_TOTALS_DIR = os.path.join("data", "cube_totals")
+CUBE_MEASURES = ['revenue', 'quantity', 'order_count', 'distinct_customers']
+CUBE_COLUMNS = ['date', 'dimension', 'key'] + CUBE_MEASURES + ['stock', 'clients']
+TOTAL_KEY = 0
+
+
+def cube_path(date):
+    """Chemin (format CSV de référence) du cube d'une journée"""
+    return os.path.join(CUBE_DIR, str(date.year), str(date.month), f"{date.day}.csv")
+
+
+def cube_total_path(date):
+    """Chemin (format CSV de référence) de la ligne 'total' du cube d'une journée"""
+    return os.path.join(CUBE_TOTALS_DIR, str(date.year), str(date.month), f"{date.day}.csv")
+
+
+def total_rows(cube):
+    """Ligne 'total' d'un cube (DataFrame d'une ligne)"""
+    return cube[cube['dimension'] == 'total']
+
+
+def _order_revenue(df_orders):
+    """Montant de chaque commande (total_amount, à défaut prix x quantité)"""
+    if 'total_amount' in df_orders.columns:
+        return df_orders['total_amount']
+    if 'price' in df_orders.columns and 'quantity' in df_orders.columns:
+        return df_orders['price'] * df_orders['quantity']
+    return pd.Series(0.0, index=df_orders.index)
+
+
+def _group_measures(orders, by):
+    """Mesures du cube agrégées par `by` en un seul groupby"""
+    grouped = orders.groupby(by, sort=True)
+    measures = grouped.agg(
+        revenue=('revenue', 'sum'),
+        quantity=('quantity', 'sum'),
+        order_count=('order_id', 'nunique'),
+    )
+    measures['distinct_customers'] = grouped['customer_id'].nunique()
+    return measures
+
+
+def build_daily_cube(date, df_clients, df_products, df_orders):
+    """
+    Agrège les DataFrames enrichis d'une journée en un petit cube
+    (CA, quantités, nombre de commandes, clients distincts) par produit, par client et au total
+    """
+    date_str = date.strftime('%Y-%m-%d')
+    orders = pd.DataFrame({
+        'order_id': df_orders['order_id'].to_numpy() if 'order_id' in df_orders.columns else np.arange(df_orders.shape[0]),
+        'product_id': df_orders['product_id'].to_numpy() if 'product_id' in df_orders.columns else np.nan,
+        'customer_id': df_orders['customer_id'].to_numpy() if 'customer_id' in df_orders.columns else np.nan,
+        'quantity': df_orders['quantity'].to_numpy() if 'quantity' in df_orders.columns else 0,
+        'revenue': _order_revenue(df_orders).to_numpy(),
+    })
+
+    total = {
+        'dimension': 'total',
+        'key': TOTAL_KEY,
+        'revenue': orders['revenue'].sum(),
+        'quantity': orders['quantity'].sum(),
+        'order_count': orders['order_id'].nunique(),
+        'distinct_customers': orders['customer_id'].nunique(),
+        'stock': df_products['stock'].sum() if 'stock' in df_products.columns else 0,
+        'clients': df_clients['customer_id'].nunique() if 'customer_id' in df_clients.columns else 0,
+    }
+    parts = [pd.DataFrame([total])]
+
+    # Par produit : ventes du jour + stock de tous les produits connus
+    by_product = _group_measures(orders, 'product_id')
+    if 'product_id' in df_products.columns and 'stock' in df_products.columns:
+        stock = df_products.groupby('product_id', sort=True)['stock'].sum()
+        by_product = by_product.join(stock, how='outer')
+        by_product[CUBE_MEASURES] = by_product[CUBE_MEASURES].fillna(0)
+    parts.append(by_product.rename_axis('key').reset_index().assign(dimension='product'))
+
+    # Par client
+    by_customer = _group_measures(orders, 'customer_id')
+    parts.append(by_customer.rename_axis('key').reset_index().assign(dimension='customer'))
+
+    cube = pd.concat(parts, ignore_index=True)
+    cube['date'] = date_str
+    counts = ['quantity', 'order_count', 'distinct_customers']
+    cube[counts] = cube[counts].fillna(0).astype('int64')
+    return cube.reindex(columns=CUBE_COLUMNS)
+
+
+def save_daily_cube(date, cube):
+    """Écrit le cube d'une journée et sa ligne 'total' ; retourne le chemin du cube"""
+    path = write_table(cube, cube_path(date), 'daily_cube')
+    write_table(total_rows(cube), cube_total_path(date), 'daily_cube')
+    return path
+
+
+def load_daily_cube(date, dimension=None, columns=None):
+    """
+    Lit le cube d'une journée (None s'il n'existe pas)
+    `dimension` : 'total', 'product' ou 'customer' pour ne garder que ces lignes
+    ('total' : lu dans le fichier de la ligne total s'il existe)
+    """
+    path = cube_path(date)
+    if dimension == 'total' and table_exists(cube_total_path(date)):
+        path = cube_total_path(date)
+    elif not table_exists(path):
+        return None
+    if columns is not None:
+        columns = list(dict.fromkeys(['dimension'] + list(columns)))
+    cube = read_table(path, columns=columns, entity='daily_cube')
+    if dimension is not None:
+        cube = cube[cube['dimension'] == dimension]
+    return cube
+
+
+def cube_totals(cube):
+    """Ligne 'total' d'un cube sous forme de dictionnaire"""
+    total = cube[cube['dimension'] == 'total']
+    return total.iloc[0].to_dict() if not total.empty else {}
+
+
+def load_month_totals(year, month):
+    """
+    Lignes 'total' des cubes quotidiens d'un mois (dans l'ordre des fichiers),
+    DataFrame vide si aucun cube n'existe pour ce mois
+    """
+    tables = list_tables(os.path.join(CUBE_DIR, str(year), str(int(month))))
+    totals = list_tables(os.path.join(CUBE_TOTALS_DIR, str(year), str(int(month))))
+    frames = []
+    for day, path in tables.items():
+        path = totals.get(day, path)
+        cube = read_table(path, columns=['date', 'dimension'] + CUBE_MEASURES, entity='daily_cube')
+        frames.append(cube[cube['dimension'] == 'total'])
+    if not frames:
+        return pd.DataFrame(columns=['date', 'dimension'] + CUBE_MEASURES)
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,431 @@
+import json
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from .storage import find_table, read_table, write_table, table_exists
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou inter-processus indisponible
+    fcntl = None
+
+# Dimensions construites à partir des couches nettoyées
+DIMENSIONS_DIR = os.path.join("data", "dimensions")
+CLEAN_DATA_DIR = os.path.join("data", "clean_data")
+
+try:
+    import pyarrow  # noqa: F401
+    DIMENSION_FORMAT = "parquet"  # rechargement rapide et typé
+except ImportError:
+    DIMENSION_FORMAT = None  # format de stockage configuré
+
+CUSTOMER_DIMENSION_PATH = os.path.join(DIMENSIONS_DIR, "customers.csv")
+CUSTOMER_SOURCES_PATH = os.path.join(DIMENSIONS_DIR, "customers_sources.json")
+CUSTOMER_ATTRIBUTES = ['firstname', 'lastname', 'email']
+
+# Produits : une partition par jour (AAAA/M/J), chacune contenant le dernier état connu
+# de chaque produit à cette date ; la taille d'une partition ne dépend pas de l'historique
+PRODUCT_DIMENSION_DIR = os.path.join(DIMENSIONS_DIR, "products")
+PRODUCT_SOURCES_PATH = os.path.join(DIMENSIONS_DIR, "products_partitions.json")
+PRODUCT_ATTRIBUTES = ['product_name', 'stock', 'stock_status', 'unit_price']
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def stock_status(stock):
+    """Statut de stock : rupture, stock faible (< 10) ou en stock"""
+    return np.where(stock == 0, 'out_of_stock', np.where(stock < 10, 'low_stock', 'in_stock'))
+
+
+def _customer_rows(path, date_str):
+    """Lignes de la dimension clients issues d'un fichier clients nettoyé"""
+    df = read_table(path, columns=['customer_id'] + CUSTOMER_ATTRIBUTES, entity='clients')
+    return df.assign(last_seen=date_str)
+
+
+def _index_customers(df):
+    """
+    Garde la version la plus récente de chaque client et indexe par customer_id trié
+    """
+    df = df.sort_values('last_seen', kind='stable')
+    df = df.drop_duplicates('customer_id', keep='last')
+    return df.set_index('customer_id').sort_index()
+
+
+def product_unit_prices(df_orders):
+    """
+    Prix unitaire moyen pondéré par produit sur les commandes (somme montants / somme quantités)
+    """
+    if df_orders.empty or not {'product_id', 'quantity', 'price'} <= set(df_orders.columns):
+        return pd.Series(dtype='float64')
+    sales = pd.DataFrame({
+        'product_id': df_orders['product_id'].to_numpy(),
+        'quantity': df_orders['quantity'].to_numpy(),
+        'amount': (df_orders['quantity'] * df_orders['price']).to_numpy(),
+    }).groupby('product_id').sum()
+    return sales['amount'] / sales['quantity']
+
+
+def _clean_orders_path(date_str):
+    """Chemin (format CSV de référence) des commandes nettoyées d'un jour"""
+    year, month, day = (int(part) for part in date_str.split('-'))
+    return os.path.join(CLEAN_DATA_DIR, "orders", str(year), str(month), f"{day}.csv")
+
+
+def _product_rows(path, date_str):
+    """
+    Lignes (product_id, date) de la dimension produits issues d'un fichier produits nettoyé,
+    avec le prix unitaire moyen des commandes nettoyées du même jour (manquant si non vendu) ;
+    les produits vendus absents du fichier produits donnent des lignes de prix seul (sans stock)
+    """
+    df = read_table(path, columns=['product_id', 'product_name', 'stock'], entity='products')
+    df['date'] = pd.Timestamp(date_str)
+    df['stock_status'] = stock_status(df['stock'])
+    prices = pd.Series(dtype='float64')
+    orders_path = _clean_orders_path(date_str)
+    if table_exists(orders_path):
+        prices = product_unit_prices(read_table(orders_path, columns=['product_id', 'quantity', 'price'],
+                                                entity='orders'))
+    df['unit_price'] = df['product_id'].map(prices).astype('float64')
+    price_only = prices[~prices.index.isin(df['product_id'])]
+    if not price_only.empty:
+        df = pd.concat([df, pd.DataFrame({
+            'product_id': price_only.index.to_numpy(),
+            'date': pd.Timestamp(date_str),
+            'unit_price': price_only.to_numpy(dtype='float64'),
+        })], ignore_index=True)
+    return df
+
+
+def _index_products(df):
+    """
+    Dernier état connu de chaque produit (une ligne par product_id),
+    trié par (date, product_id) : prêt pour une jointure as-of
+    Le prix unitaire est le dernier prix connu du produit (reporté sur les jours sans vente)
+    """
+    df = df.assign(date=pd.to_datetime(df['date']).astype('datetime64[ns]'),
+                   product_id=df['product_id'].astype('int64'))
+    df = df.sort_values('date', kind='stable')
+    if 'unit_price' in df.columns:
+        last_prices = (df.dropna(subset=['unit_price'])
+                       .drop_duplicates('product_id', keep='last')
+                       .set_index('product_id')['unit_price'])
+        df = df[df['stock'].notna()]  # lignes de prix seul : seul le prix est conservé
+        df = df.drop_duplicates('product_id', keep='last')
+        df = df.assign(stock=df['stock'].astype('int64'), unit_price=df['product_id'].map(last_prices))
+    else:
+        df = df.drop_duplicates('product_id', keep='last')
+    return df.sort_values(['date', 'product_id'], kind='stable').reset_index(drop=True)
+
+
+def _product_partition_path(date_str):
+    """Chemin (format CSV de référence) de la partition produits d'un jour"""
+    year, month, day = (int(part) for part in date_str.split('-'))
+    return os.path.join(PRODUCT_DIMENSION_DIR, str(year), str(month), f"{day}.csv")
+
+
+DIMENSIONS = {
+    'customers': {
+        'source_dir': os.path.join(CLEAN_DATA_DIR, "clients"),
+        'path': CUSTOMER_DIMENSION_PATH,
+        'sources': CUSTOMER_SOURCES_PATH,
+        'rows': _customer_rows,
+        'index': _index_customers,
+        'restore': lambda df: df.set_index('customer_id').sort_index(),
+        'store': lambda dim: dim.reset_index(),
+        'entity': 'clients',
+    },
+    'products': {
+        'source_dir': os.path.join(CLEAN_DATA_DIR, "products"),
+        'path': PRODUCT_DIMENSION_DIR,
+        'sources': PRODUCT_SOURCES_PATH,
+        'rows': _product_rows,
+        'index': _index_products,
+        'restore': _index_products,
+        'store': lambda dim: dim,
+        'entity': None,
+        'partitioned': True,
+        # Commandes nettoyées : prix unitaires du jour (une modification reconstruit le jour)
+        'price_dir': os.path.join(CLEAN_DATA_DIR, "orders"),
+    },
+}
+
+
+@contextmanager
+def _dimension_lock(name):
+    """
+    Verrou de construction d'une dimension (threads du processus + autres processus :
+    tâches Airflow ou rattrapage en parallèle)
+    """
+    with _lock:
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(DIMENSIONS_DIR, exist_ok=True)
+        with open(os.path.join(DIMENSIONS_DIR, f"{name}.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _clean_tables(root):
+    """
+    Liste les fichiers nettoyés {chemin: (date 'YYYY-MM-DD', mtime)} de root/AAAA/M/J.*
+    """
+    tables = {}
+    if not os.path.isdir(root):
+        return tables
+    for year in os.listdir(root):
+        year_dir = os.path.join(root, year)
+        if not os.path.isdir(year_dir):
+            continue
+        for month in os.listdir(year_dir):
+            month_dir = os.path.join(year_dir, month)
+            if not os.path.isdir(month_dir):
+                continue
+            for entry in os.scandir(month_dir):
+                day, ext = os.path.splitext(entry.name)
+                if ext not in ('.csv', '.parquet') or not day.isdigit():
+                    continue
+                date_str = f"{int(year):04d}-{int(month):02d}-{int(day):02d}"
+                tables[entry.path] = (date_str, entry.stat().st_mtime)
+    return tables
+
+
+def _load_sources(name):
+    """Fichiers déjà intégrés à la dimension {chemin: mtime}"""
+    path = DIMENSIONS[name]['sources']
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_sources(name, sources):
+    """Enregistre la liste des fichiers intégrés (écriture atomique)"""
+    os.makedirs(DIMENSIONS_DIR, exist_ok=True)
+    path = DIMENSIONS[name]['sources']
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(sources, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def _read_dimension(name, path):
+    """Relit une dimension stockée et la remet dans sa forme indexée"""
+    spec = DIMENSIONS[name]
+    if spec['entity']:
+        return spec['restore'](read_table(path, entity=spec['entity']))
+    return spec['restore'](read_table(path))
+
+
+def _product_partitions():
+    """Partitions de la dimension produits {date 'YYYY-MM-DD': chemin}"""
+    return {date_str: path for path, (date_str, _) in _clean_tables(PRODUCT_DIMENSION_DIR).items()}
+
+
+def _read_partition(name, path):
+    """Relit une partition, avec cache du dernier fichier lu (chemin, mtime)"""
+    cache = _cache.setdefault(f"{name}_partition", {'signature': None, 'dim': None})
+    signature = (path, os.path.getmtime(path))
+    if cache['signature'] != signature:
+        cache.update(signature=signature, dim=_read_dimension(name, path))
+    return cache['dim']
+
+
+def _partition_as_of(name, partitions, date_str=None):
+    """Partition la plus récente à la date donnée (toutes dates si None), None si aucune"""
+    eligible = [day for day in partitions if date_str is None or day <= date_str]
+    if not eligible:
+        return None
+    return _read_partition(name, partitions[max(eligible)])
+
+
+def _build_partitioned_dimension(name, full_rebuild=False):
+    """
+    Ajoute à une dimension partitionnée les jours nettoyés nouveaux ou modifiés :
+    la partition d'un jour = partition précédente + lignes nettoyées du jour.
+    Un jour intégré en retard (rattrapage) reconstruit aussi les partitions suivantes
+    Retourne le dernier état connu
+    """
+    spec = DIMENSIONS[name]
+    with _dimension_lock(name):
+        if full_rebuild:
+            shutil.rmtree(spec['path'], ignore_errors=True)
+        tables = _clean_tables(spec['source_dir'])
+        tracked = {**tables, **_clean_tables(spec['price_dir'])}
+        sources = {} if full_rebuild else _load_sources(name)
+        new_tables = {path: info for path, info in tracked.items() if sources.get(path) != info[1]}
+        partitions = _product_partitions()
+        if not new_tables:
+            return _partition_as_of(name, partitions)
+
+        days = {}
+        for path, (date_str, _) in sorted(tables.items()):
+            days.setdefault(date_str, []).append(path)
+        first = min(date_str for date_str, _ in new_tables.values())
+        rebuilt = sorted(day for day in days if day >= first)
+
+        previous = [day for day in partitions if day < first]
+        dim = _read_dimension(name, partitions[max(previous)]) if previous else None
+        for date_str in rebuilt:
+            frames = [dim] if dim is not None else []
+            frames += [spec['rows'](path, date_str) for path in days[date_str]]
+            dim = spec['index'](pd.concat(frames, ignore_index=True))
+            write_table(spec['store'](dim), _product_partition_path(date_str), spec['entity'], fmt=DIMENSION_FORMAT)
+        sources.update({p: info[1] for p, info in new_tables.items()})
+        _save_sources(name, sources)
+
+        if dim is None:
+            return _partition_as_of(name, partitions)
+        print(f"Dimension {name} : {dim.shape[0]} lignes ({len(rebuilt)} partitions écrites)")
+        return _partition_as_of(name, _product_partitions())
+
+
+def build_dimension(name, full_rebuild=False):
+    """
+    Met à jour une dimension avec les fichiers nettoyés nouveaux ou modifiés
+    depuis la dernière construction, puis la retourne
+    """
+    spec = DIMENSIONS[name]
+    if spec.get('partitioned'):
+        return _build_partitioned_dimension(name, full_rebuild)
+    with _dimension_lock(name):
+        cache = _cache.setdefault(name, {'signature': None, 'dim': None})
+        tables = _clean_tables(spec['source_dir'])
+        sources = {} if full_rebuild else _load_sources(name)
+        existing = None if full_rebuild else find_table(spec['path'])
+
+        new_tables = {path: info for path, info in tables.items() if sources.get(path) != info[1]}
+        if not new_tables and existing:
+            signature = (os.path.getmtime(existing), len(tables))
+            if cache['signature'] != signature:
+                cache.update(signature=signature, dim=_read_dimension(name, existing))
+            return cache['dim']
+
+        frames = []
+        if existing:
+            frames.append(spec['store'](_read_dimension(name, existing)))
+        for path, (date_str, _) in sorted(new_tables.items(), key=lambda item: item[1][0]):
+            frames.append(spec['rows'](path, date_str))
+        if not frames:
+            return None
+
+        dim = spec['index'](pd.concat(frames, ignore_index=True))
+        path = write_table(spec['store'](dim), spec['path'], spec['entity'], fmt=DIMENSION_FORMAT)
+        sources.update({p: info[1] for p, info in new_tables.items()})
+        _save_sources(name, sources)
+
+        cache.update(signature=(os.path.getmtime(path), len(tables)), dim=dim)
+        print(f"Dimension {name} : {dim.shape[0]} lignes ({len(new_tables)} fichiers intégrés)")
+        return dim
+
+
+def load_dimension(name, refresh=True):
+    """
+    Retourne une dimension (None si aucune donnée nettoyée)
+    refresh => intègre d'abord les nouveaux fichiers nettoyés
+    """
+    cache = _cache.get(name)
+    if not refresh and cache and cache['dim'] is not None:
+        return cache['dim']
+    return build_dimension(name)
+
+
+def build_customer_dimension(full_rebuild=False):
+    """Met à jour la dimension clients (voir build_dimension)"""
+    return build_dimension('customers', full_rebuild)
+
+
+def build_product_dimension(full_rebuild=False):
+    """Met à jour la dimension produits (voir build_dimension)"""
+    return build_dimension('products', full_rebuild)
+
+
+def load_customer_dimension(refresh=True):
+    """Dimension clients, indexée et triée par customer_id"""
+    return load_dimension('customers', refresh)
+
+
+def load_product_dimension(refresh=True, date=None):
+    """
+    Dimension produits : dernier état connu de chaque produit à `date`
+    (partition la plus récente à cette date ; dernier état si date est None)
+    """
+    if refresh:
+        build_dimension('products')
+    return _partition_as_of('products', _product_partitions(),
+                            None if date is None else date.strftime('%Y-%m-%d'))
+
+
+def with_daily_clients(dim, df_clients):
+    """
+    Superpose en mémoire les clients du jour à la dimension (prioritaires),
+    sans rien écrire sur disque
+    """
+    if df_clients is None or df_clients.empty or 'customer_id' not in df_clients.columns:
+        return dim
+    cols = [col for col in CUSTOMER_ATTRIBUTES if col in df_clients.columns]
+    daily = df_clients[['customer_id'] + cols].set_index('customer_id')
+    if dim is None:
+        return daily[~daily.index.duplicated(keep='last')].sort_index()
+    combined = pd.concat([dim[cols], daily])
+    combined = combined[~combined.index.duplicated(keep='last')]
+    return combined.sort_index()
+
+
+def lookup_customers(customer_ids, dim, columns=None):
+    """
+    Attributs clients alignés sur `customer_ids` (recherche indexée, O(n))
+    Les clients inconnus de la dimension donnent des valeurs manquantes
+    """
+    columns = columns or [col for col in CUSTOMER_ATTRIBUTES if col in dim.columns]
+    return dim[columns].reindex(pd.Index(customer_ids, name='customer_id'))
+
+
+def with_daily_products(dim, df_products, date):
+    """
+    Superpose en mémoire les stocks du jour à la dimension produits (prioritaires)
+    """
+    if df_products is None or df_products.empty or not {'product_id', 'stock'} <= set(df_products.columns):
+        return dim
+    cols = [col for col in ['product_id', 'product_name', 'stock'] if col in df_products.columns]
+    daily = df_products[cols].assign(date=pd.Timestamp(date.strftime('%Y-%m-%d')))
+    daily['stock_status'] = stock_status(daily['stock'])
+    if dim is None:
+        return _index_products(daily)
+    return _index_products(pd.concat([dim, daily], ignore_index=True))
+
+
+def attach_stock_at_order(df_orders, dim):
+    """
+    Jointure as-of triée : pour chaque commande, dernier stock connu du produit
+    à la date de commande (colonnes stock_at_order, stock_status_at_order)
+    """
+    if dim is None or df_orders.empty or not {'product_id', 'order_date'} <= set(df_orders.columns):
+        return df_orders
+
+    left = df_orders.reset_index(drop=True)
+    keys = pd.DataFrame({
+        '_row': np.arange(left.shape[0]),
+        '_asof_date': pd.to_datetime(left['order_date']).astype('datetime64[ns]'),
+        '_asof_product': left['product_id'].astype('int64'),
+    }).sort_values('_asof_date', kind='stable')
+    right = pd.DataFrame({
+        '_asof_date': dim['date'],
+        '_asof_product': dim['product_id'],
+        'stock_at_order': dim['stock'],
+        'stock_status_at_order': dim['stock_status'],
+    })
+
+    matched = pd.merge_asof(keys, right, on='_asof_date', by='_asof_product', direction='backward')
+    matched = matched.sort_values('_row')
+    left['stock_at_order'] = matched['stock_at_order'].to_numpy()
+    left['stock_status_at_order'] = matched['stock_status_at_order'].to_numpy()
+    return left
@@ -0,0 +1,71 @@
+import json
+import os
+import threading
+import time
+
+# Cache persistant des identifiants Google Drive (dossiers et fichiers)
+DRIVE_ID_CACHE_PATH = os.path.join("data", "cache", "drive_ids.json")
+DRIVE_ID_TTL = 6 * 3600  # secondes avant de refaire une recherche ListFile
+
+_lock = threading.Lock()
+
+
+def _load_cache():
+    """Lit le fichier de cache (vide si absent ou illisible)"""
+    if not os.path.exists(DRIVE_ID_CACHE_PATH):
+        return {}
+    try:
+        with open(DRIVE_ID_CACHE_PATH, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(cache):
+    """Ecrit le cache via un fichier temporaire puis renommage"""
+    os.makedirs(os.path.dirname(DRIVE_ID_CACHE_PATH), exist_ok=True)
+    tmp_path = f"{DRIVE_ID_CACHE_PATH}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, DRIVE_ID_CACHE_PATH)
+
+
+def cache_get(namespace, name, ttl=DRIVE_ID_TTL):
+    """
+    Retourne l'id Drive mis en cache pour `name`, ou None s'il est absent/expire
+    """
+    with _lock:
+        entry = _load_cache().get(namespace, {}).get(name)
+    if not entry or time.time() - entry.get("cached_at", 0) > ttl:
+        return None
+    return entry["id"]
+
+
+def cache_put(namespace, ids):
+    """
+    Enregistre un dictionnaire {nom: id Drive} dans l'espace `namespace`
+    """
+    if not ids:
+        return
+    now = time.time()
+    with _lock:
+        cache = _load_cache()
+        entries = cache.setdefault(namespace, {})
+        for name, file_id in ids.items():
+            entries[name] = {"id": file_id, "cached_at": now}
+        _save_cache(cache)
+
+
+def cache_invalidate(namespace, name=None):
+    """
+    Supprime une entree (ou tout l'espace `namespace`) devenue obsolete
+    """
+    with _lock:
+        cache = _load_cache()
+        if namespace not in cache:
+            return
+        if name is None:
+            del cache[namespace]
+        else:
+            cache[namespace].pop(name, None)
+        _save_cache(cache)
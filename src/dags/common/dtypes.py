@@ -0,0 +1,154 @@
+import pandas as pd
+from .instrument import record_read, file_size
+
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = "string[pyarrow]"
+except ImportError:
+    STRING_DTYPE = "string"
+
+# Plan de types par entité pour les lectures des couches raw / clean / enriched
+#   'integer'  : entier réduit au plus petit type capable de contenir les valeurs
+#   'float64'  : montants (prix, CA) conservés en double précision
+#   'category' : chaînes à faible cardinalité (Customer_N, Product_N, ...)
+#   'string'   : chaînes propres à chaque client ; catégorie si elles se répètent
+#                assez (ratio <= CATEGORY_MAX_RATIO), sinon chaînes Arrow
+#   'datetime' : dates parsées à la lecture
+CATEGORY_MAX_RATIO = 0.5
+
+DTYPE_PLAN = {
+    "clients": {
+        "date": "category",
+        "customer_id": "integer",
+        "firstname": "string",
+        "lastname": "string",
+        "email": "string",
+    },
+    "products": {
+        "date": "category",
+        "product_id": "integer",
+        "product_name": "category",
+        "stock": "integer",
+        "unit_price": "float64",
+        "stock_value": "float64",
+        "stock_status": "category",
+    },
+    "orders": {
+        "order_id": "integer",
+        "order_date": "datetime",
+        "customer_id": "integer",
+        "customer_name": "category",
+        "product_id": "integer",
+        "product_name": "category",
+        "quantity": "integer",
+        "price": "float64",
+        "firstname": "string",
+        "lastname": "string",
+        "email": "string",
+        "total_amount": "float64",
+        "stock_at_order": "integer",
+        "stock_status_at_order": "category",
+    },
+    "daily_cube": {
+        "date": "category",
+        "dimension": "category",
+        "key": "integer",
+        "revenue": "float64",
+        "quantity": "integer",
+        "order_count": "integer",
+        "distinct_customers": "integer",
+        "stock": "float64",
+        "clients": "float64",
+    },
+}
+
+
+def read_csv_options(entity, raw=False):
+    """
+    Options read_csv du plan : catégories (et dates) dès le parsing
+    Les colonnes numériques sont réduites après lecture (apply_dtype_plan),
+    et ne sont pas typées à la lecture des fichiers raw non encore validés
+    """
+    plan = DTYPE_PLAN.get(entity, {})
+    options = {"dtype": {col: "category" for col, kind in plan.items() if kind == "category"}}
+    if not raw:
+        dates = [col for col, kind in plan.items() if kind == "datetime"]
+        if dates:
+            options["parse_dates"] = dates
+    return options
+
+
+def read_csv_planned(path, entity, raw=False, columns=None):
+    """read_csv avec le plan de types de l'entité"""
+    options = read_csv_options(entity, raw=raw)
+    if columns is not None:
+        wanted = set(columns)
+        options["usecols"] = lambda col: col in wanted
+        options["dtype"] = {col: t for col, t in options["dtype"].items() if col in wanted}
+        if "parse_dates" in options:
+            options["parse_dates"] = [col for col in options["parse_dates"] if col in wanted]
+    df = pd.read_csv(path, **options)
+    record_read(df.shape[0], file_size(path))
+    return df if raw else apply_dtype_plan(df, entity)
+
+
+def apply_dtype_plan(df, entity):
+    """
+    Applique le plan de types aux colonnes présentes
+    (les colonnes entières contenant des valeurs manquantes sont laissées telles quelles)
+    """
+    plan = DTYPE_PLAN.get(entity, {})
+    for col, kind in plan.items():
+        if col not in df.columns:
+            continue
+        series = df[col]
+        if kind == "integer":
+            if pd.api.types.is_numeric_dtype(series) and not series.isna().any():
+                df[col] = pd.to_numeric(series, downcast="integer")
+        elif kind == "float64":
+            if pd.api.types.is_numeric_dtype(series):
+                df[col] = series.astype("float64")
+        elif kind == "category":
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                df[col] = series.astype("category")
+        elif kind == "string":
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                continue
+            if series.nunique() <= CATEGORY_MAX_RATIO * len(series):
+                df[col] = series.astype("category")
+            else:
+                df[col] = series.astype(STRING_DTYPE)
+        elif kind == "datetime":
+            if not pd.api.types.is_datetime64_any_dtype(series):
+                df[col] = pd.to_datetime(series, errors="coerce")
+    return df
+
+
+def memory_report(frames):
+    """
+    Empreinte mémoire (profonde) d'un dictionnaire {nom: DataFrame}
+    """
+    rows = []
+    for name, df in frames.items():
+        size = int(df.memory_usage(deep=True).sum())
+        rows.append({
+            "table": name,
+            "rows": df.shape[0],
+            "bytes": size,
+            "bytes_per_row": size / df.shape[0] if df.shape[0] else 0.0,
+        })
+    return pd.DataFrame(rows, columns=["table", "rows", "bytes", "bytes_per_row"])
+
+
+def compare_memory(paths):
+    """
+    Compare l'empreinte mémoire sans plan (types par défaut) et avec plan
+    `paths` : {nom: (chemin CSV, entité)}
+    """
+    default = memory_report({name: pd.read_csv(path) for name, (path, _) in paths.items()})
+    planned = memory_report({name: read_csv_planned(path, entity) for name, (path, entity) in paths.items()})
+    report = default[["table", "rows"]].copy()
+    report["default_bytes"] = default["bytes"]
+    report["planned_bytes"] = planned["bytes"]
+    report["reduction_pct"] = 100 * (1 - report["planned_bytes"] / report["default_bytes"])
+    return report
@@ -1,8 +1,13 @@
 # src/dags/common/enrich.py
 import pandas as pd
-import numpy as np
-from datetime import datetime
 import os
+from .storage import read_table, table_exists, write_table
+from .cube import build_daily_cube, save_daily_cube
+from .rollup import record_daily_sketches
+from .instrument import instrumented, mark_failed
+from .dimensions import (load_customer_dimension, with_daily_clients, lookup_customers,
+                         load_product_dimension, with_daily_products, attach_stock_at_order,
+                         stock_status, product_unit_prices)
 
 def ensure_directory_exists(file_path):
     """Crée automatiquement le dossier s'il n'existe pas"""
@@ -12,6 +17,100 @@ def ensure_directory_exists(file_path):
         print(f"Dossier créé: {directory}")
     return file_path
 
+def enriched_data_path(entity, date):
+    """Chemin (format CSV de référence) du fichier enrichi d'une entité"""
+    return f"data/enriched_data/{date.year}/{date.month}/{entity}_{date.day}.csv"
+
+def enrich_frames(df_clients, df_products, df_orders, customers=None, products=None, date=None):
+    """
+    Enrichit des DataFrames nettoyés déjà en mémoire
+    `customers` : dimension clients (dimensions.py) ; à défaut, fusion avec les clients du jour
+    `products` : dimension produits ; ajoute aux commandes le stock connu à la date de commande
+    (les stocks du jour `date` sont ajoutés en mémoire) et fournit le dernier prix connu
+    des produits non vendus ce jour
+    Retourne {'clients', 'products', 'orders'} sans rien écrire sur disque
+    """
+    # ENRICHISSEMENT CLIENTS 
+    # (pas de registration_date dans vos données, donc on skip)
+    print("⏭️ Pas d'enrichissement clients (colonne registration_date manquante)")
+        
+    # ENRICHISSEMENT PRODUITS 
+    if not df_products.empty:
+        if 'stock' in df_products.columns:  # ← Votre colonne s'appelle 'stock'
+            df_products = df_products.copy()
+            # Valeur du stock au prix unitaire moyen des commandes du jour, à défaut au dernier
+            # prix moyen connu du produit (dimension produits à la date) ; manquant si jamais vendu
+            unit_price = df_products['product_id'].map(product_unit_prices(df_orders))
+            if products is not None and 'unit_price' in products.columns:
+                last_prices = products.set_index('product_id')['unit_price']
+                unit_price = unit_price.fillna(df_products['product_id'].map(last_prices))
+            df_products['unit_price'] = unit_price.astype('float64')
+            df_products['stock_value'] = df_products['stock'] * df_products['unit_price']
+            df_products['stock_status'] = stock_status(df_products['stock'])
+            unpriced = int(df_products['unit_price'].isna().sum())
+            print(f"✓ Enrichissement produits terminé ({unpriced} produits sans prix connu)")
+        else:
+            print("⏭️ Colonne stock manquante pour produits")
+    else:
+        print("⏭️ DataFrame produits vide")
+    
+    # ENRICHISSEMENT COMMANDES
+    df_orders_enriched = df_orders.copy()
+    
+    # Recherche indexée dans la dimension clients (couverture de tout l'historique)
+    if customers is not None and not df_orders.empty and 'customer_id' in df_orders.columns:
+        customers = with_daily_clients(customers, df_clients)
+        client_info = lookup_customers(df_orders['customer_id'].to_numpy(), customers)
+        df_orders_enriched = df_orders.reset_index(drop=True)
+        for col in client_info.columns:
+            df_orders_enriched[col] = client_info[col].to_numpy()
+        missing = int(client_info.isna().all(axis=1).sum())
+        print(f"✓ Enrichissement commandes-clients via la dimension ({missing} commandes sans client connu)")
+    
+    # Fusion avec clients si les colonnes existent
+    elif not df_orders.empty and not df_clients.empty:
+        if 'customer_id' in df_orders.columns and 'customer_id' in df_clients.columns:
+            # Ajouter les informations clients aux commandes
+            client_cols = ['customer_id', 'firstname', 'lastname', 'email']
+            client_cols = [col for col in client_cols if col in df_clients.columns]
+            
+            df_orders_enriched = pd.merge(
+                df_orders, df_clients[client_cols],
+                on='customer_id', how='left'
+            )
+            print("✓ Fusion commandes-clients terminée")
+        else:
+            print("⏭️ Colonne customer_id manquante pour la fusion clients")
+    
+    # Stock du produit à la date de commande (jointure as-of sur la dimension produits)
+    if products is not None and not df_orders_enriched.empty:
+        if date is not None:
+            products = with_daily_products(products, df_products, date)
+        df_orders_enriched = attach_stock_at_order(df_orders_enriched, products)
+        unmatched = int(df_orders_enriched['stock_at_order'].isna().sum())
+        print(f"✓ Stock à la date de commande ajouté ({unmatched} commandes sans stock connu)")
+    
+    # Calcul du montant total pour les commandes
+    if 'quantity' in df_orders_enriched.columns and 'price' in df_orders_enriched.columns:
+        df_orders_enriched['total_amount'] = (
+            df_orders_enriched['quantity'] * df_orders_enriched['price']
+        )
+        print("✓ Calcul du montant total terminé")
+    else:
+        missing_cols = []
+        if 'quantity' not in df_orders_enriched.columns:
+            missing_cols.append('quantity')
+        if 'price' not in df_orders_enriched.columns:
+            missing_cols.append('price')
+        print(f"⏭️ Colonnes manquantes pour calcul montant: {missing_cols}")
+    
+    return {
+        'clients': df_clients,
+        'products': df_products,
+        'orders': df_orders_enriched
+    }
+
+@instrumented()
 def enrich_data(date):
     """
     Enrichit les données nettoyées - adaptée à votre structure
@@ -23,99 +122,51 @@ def enrich_data(date):
         orders_path = f"data/clean_data/orders/{date.year}/{date.month}/{date.day}.csv"
         
         print(f"Recherche des fichiers:")
-        print(f"  Clients: {clients_path} - {'EXISTE' if os.path.exists(clients_path) else 'MANQUANT'}")
-        print(f"  Produits: {products_path} - {'EXISTE' if os.path.exists(products_path) else 'MANQUANT'}")
-        print(f"  Commandes: {orders_path} - {'EXISTE' if os.path.exists(orders_path) else 'MANQUANT'}")
+        print(f"  Clients: {clients_path} - {'EXISTE' if table_exists(clients_path) else 'MANQUANT'}")
+        print(f"  Produits: {products_path} - {'EXISTE' if table_exists(products_path) else 'MANQUANT'}")
+        print(f"  Commandes: {orders_path} - {'EXISTE' if table_exists(orders_path) else 'MANQUANT'}")
         
         # Vérification que les fichiers existent
-        if not all(os.path.exists(path) for path in [clients_path, products_path, orders_path]):
-            missing_files = [path for path in [clients_path, products_path, orders_path] if not os.path.exists(path)]
+        if not all(table_exists(path) for path in [clients_path, products_path, orders_path]):
+            missing_files = [path for path in [clients_path, products_path, orders_path] if not table_exists(path)]
             print(f"Fichiers manquants pour l'enrichissement: {missing_files}")
             return {}
         
-        df_clients = pd.read_csv(clients_path)
-        df_products = pd.read_csv(products_path)
-        df_orders = pd.read_csv(orders_path)
+        df_clients = read_table(clients_path, entity='clients')
+        df_products = read_table(products_path, entity='products')
+        df_orders = read_table(orders_path, entity='orders')
         
         print(f"\nStructure des données:")
         print(f"Clients - Colonnes: {df_clients.columns.tolist()}")
         print(f"Produits - Colonnes: {df_products.columns.tolist()}")
         print(f"Commandes - Colonnes: {df_orders.columns.tolist()}")
         
-        # ENRICHISSEMENT CLIENTS 
-        # (pas de registration_date dans vos données, donc on skip)
-        print("⏭️ Pas d'enrichissement clients (colonne registration_date manquante)")
-            
-        # ENRICHISSEMENT PRODUITS 
-        if not df_products.empty:
-            if 'stock' in df_products.columns:  # ← Votre colonne s'appelle 'stock'
-                # Calcul de la valeur du stock
-                df_products['stock_value'] = df_products['stock']  # ← À adapter si vous avez un prix
-                df_products['stock_status'] = np.where(
-                    df_products['stock'] == 0, 'out_of_stock',
-                    np.where(df_products['stock'] < 10, 'low_stock', 'in_stock')
-                )
-                print("✓ Enrichissement produits terminé")
-            else:
-                print("⏭️ Colonne stock manquante pour produits")
-        else:
-            print("⏭️ DataFrame produits vide")
-        
-        # ENRICHISSEMENT COMMANDES
-        df_orders_enriched = df_orders.copy()
-        
-        # Fusion avec clients si les colonnes existent
-        if not df_orders.empty and not df_clients.empty:
-            if 'customer_id' in df_orders.columns and 'customer_id' in df_clients.columns:
-                # Ajouter les informations clients aux commandes
-                client_cols = ['customer_id', 'firstname', 'lastname', 'email']
-                client_cols = [col for col in client_cols if col in df_clients.columns]
-                
-                df_orders_enriched = pd.merge(
-                    df_orders, df_clients[client_cols],
-                    on='customer_id', how='left'
-                )
-                print("✓ Fusion commandes-clients terminée")
-            else:
-                print("⏭️ Colonne customer_id manquante pour la fusion clients")
-        
-        # Calcul du montant total pour les commandes
-        if 'quantity' in df_orders_enriched.columns and 'price' in df_orders_enriched.columns:
-            df_orders_enriched['total_amount'] = (
-                df_orders_enriched['quantity'] * df_orders_enriched['price']
-            )
-            print("✓ Calcul du montant total terminé")
-        else:
-            missing_cols = []
-            if 'quantity' not in df_orders_enriched.columns:
-                missing_cols.append('quantity')
-            if 'price' not in df_orders_enriched.columns:
-                missing_cols.append('price')
-            print(f"⏭️ Colonnes manquantes pour calcul montant: {missing_cols}")
+        enriched = enrich_frames(df_clients, df_products, df_orders, load_customer_dimension(),
+                                 load_product_dimension(date=date), date)
         
         # Sauvegarde avec création automatique des dossiers
         enriched_dir = ensure_directory_exists(
             f"data/enriched_data/{date.year}/{date.month}/"
         )
         
-        df_clients.to_csv(f"{enriched_dir}clients_{date.day}.csv", index=False)
-        df_products.to_csv(f"{enriched_dir}products_{date.day}.csv", index=False)
-        df_orders_enriched.to_csv(f"{enriched_dir}orders_{date.day}.csv", index=False)
+        for entity, df in enriched.items():
+            write_table(df, enriched_data_path(entity, date), entity)
+        
+        # Cube quotidien pré-agrégé et sketches des clients pour les métriques
+        save_daily_cube(date, build_daily_cube(date, enriched['clients'], enriched['products'], enriched['orders']))
+        record_daily_sketches(date, enriched['clients'], enriched['orders'])
         
         print(f"\n✓ Données enrichies sauvegardées dans: {enriched_dir}")
         
         # Aperçu des données enrichies
         print(f"\nAperçu des commandes enrichies:")
-        print(df_orders_enriched[['order_id', 'customer_id', 'product_id', 'quantity', 'price', 'total_amount']].head(2))
+        print(enriched['orders'][['order_id', 'customer_id', 'product_id', 'quantity', 'price', 'total_amount']].head(2))
         
-        return {
-            'clients': df_clients,
-            'products': df_products,
-            'orders': df_orders_enriched
-        }
+        return enriched
         
     except Exception as e:
         print(f"❌ Erreur lors de l'enrichissement: {e}")
+        mark_failed(e)
         import traceback
         traceback.print_exc()
-        return {}
\ No newline at end of file
+        return {}
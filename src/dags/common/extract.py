@@ -1,104 +1,589 @@
 import os.path
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
-import sqlite3
 import io
-from .google_auth import get_google_drive_service  # Import relatif
+import random
+import time
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pydrive2.files import ApiRequestError
+from .google_auth import get_drive_session  # Import relatif
+from .drive_cache import cache_get, cache_put, cache_invalidate
+from .state import get_state, set_state, is_unchanged
+from .instrument import instrumented, record_read, record_write, file_size, mark_failed, submit_in_context
+from .sqlite_source import get_read_connection, ensure_index
 
 # Configuration
 DATA_DIR = "data"
 RAW_DATA_DIR = os.path.join(DATA_DIR, "raw_data")
+ORDERS_CHUNK_SIZE = 50_000  # lignes lues par chunk en mode streaming
+CLIENTS_FOLDER = "clients"
+DRIVE_MAX_WORKERS = 8  # telechargements Drive simultanes
+DRIVE_MAX_RETRIES = 5
+DRIVE_BACKOFF_BASE = 1.0  # secondes
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+CACHE_DIR = os.path.join(DATA_DIR, "cache")
+PRODUCTS_CACHE_DIR = os.path.join(CACHE_DIR, "products")
+
+# Snapshots products.csv deja parses, indexes par (file_id, version)
+_PRODUCTS_SNAPSHOTS = {}
 
 def connect_to_drive():
-    """Connexion a Google Drive avec PyDrive2"""
-    return get_google_drive_service()
+    """Connexion a Google Drive avec PyDrive2 (session partagee du processus)"""
+    return get_drive_session()
 
-def extract_clients(date: datetime, service=None):
+def _resolve_folder_id(service, folder_name: str, refresh: bool = False):
     """
-    Extrait le fichier clients du jour depuis Google Drive
+    Retourne l'id du dossier Drive, depuis le cache si possible
     """
-    if service is None:
-        service = connect_to_drive()
+    folder_id = None if refresh else cache_get("folders", folder_name)
+    if folder_id:
+        return folder_id
     
-    FOLDER = "clients"
-    filename = f"clients_{date.strftime('%Y-%m-%d')}.csv"
-    
-    # Recherche du dossier clients
-    folder_query = f"title='{FOLDER}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
+    folder_query = f"title='{folder_name}' and mimeType='application/vnd.google-apps.folder' and trashed=false"
     folders = service.ListFile({'q': folder_query}).GetList()
     
     if not folders:
-        raise FileNotFoundError(f"Dossier '{FOLDER}' non trouve")
+        cache_invalidate("folders", folder_name)
+        raise FileNotFoundError(f"Dossier '{folder_name}' non trouve")
     
     folder_id = folders[0]['id']
+    cache_put("folders", {folder_name: folder_id})
+    return folder_id
+
+
+def _resolve_file_id(service, folder_name: str, filename: str, refresh: bool = False):
+    """
+    Retourne l'id du fichier `filename` du dossier, depuis le cache si possible
+    """
+    file_id = None if refresh else cache_get(folder_name, filename)
+    if file_id:
+        return file_id
     
-    # Recherche du fichier
+    folder_id = _resolve_folder_id(service, folder_name, refresh=refresh)
     file_query = f"'{folder_id}' in parents and title='{filename}' and trashed=false"
-    files = service.ListFile({'q': file_query}).GetList()
+    try:
+        files = service.ListFile({'q': file_query}).GetList()
+    except ApiRequestError:
+        if refresh:
+            raise
+        # Id de dossier obsolete : nouvelle recherche
+        cache_invalidate("folders", folder_name)
+        return _resolve_file_id(service, folder_name, filename, refresh=True)
     
     if not files:
-        print(f"Aucun fichier trouve avec le nom {filename}.")
-        return
+        if not refresh:
+            # Dossier deplace ou recree (id en cache qui ne liste plus rien) : un nouvel essai
+            cache_invalidate("folders", folder_name)
+            return _resolve_file_id(service, folder_name, filename, refresh=True)
+        return None
     
-    # Telechargement
-    file_obj = service.CreateFile({'id': files[0]['id']})
+    cache_put(folder_name, {filename: files[0]['id']})
+    return files[0]['id']
+
+
+def _list_folder_files(service, folder_name: str):
+    """
+    Liste le dossier une seule fois et met en cache tous ses fichiers
+    Retourne {titre: metadonnees Drive}
+    """
+    try:
+        folder_id = _resolve_folder_id(service, folder_name)
+        files = service.ListFile({'q': f"'{folder_id}' in parents and trashed=false"}).GetList()
+    except ApiRequestError:
+        # Id de dossier obsolete : nouvelle recherche
+        cache_invalidate("folders", folder_name)
+        folder_id = _resolve_folder_id(service, folder_name, refresh=True)
+        files = service.ListFile({'q': f"'{folder_id}' in parents and trashed=false"}).GetList()
+    
+    files = {f['title']: f for f in files}
+    cache_invalidate(folder_name)
+    cache_put(folder_name, {title: f['id'] for title, f in files.items()})
+    return files
+
+
+def _clients_raw_path(date: datetime):
+    """Chemin du fichier raw des clients pour un jour"""
     local_path = os.path.join(f"{RAW_DATA_DIR}/clients/{date.year}/{date.month}", f"{date.day}.csv")
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
-    
+    return local_path
+
+
+def _download_client_file(service, file_id: str, date: datetime, file_meta=None):
+    """
+    Telecharge un fichier clients vers son chemin raw
+    (enregistre sa version dans l'etat d'extraction si les metadonnees sont connues)
+    """
+    file_obj = service.CreateFile({'id': file_id})
+    local_path = _clients_raw_path(date)
     file_obj.GetContentFile(local_path)
+    record_read(nbytes=file_size(local_path))
+    record_write(nbytes=file_size(local_path))
     print(f"Fichier telecharge : {local_path}")
+    if file_meta is not None:
+        set_state(CLIENTS_FOLDER, date.strftime('%Y-%m-%d'),
+                  watermark=file_meta.get('modifiedDate'), checksum=_snapshot_version(file_meta))
     return local_path
 
 
+def _client_file_unchanged(date: datetime, file_meta):
+    """Vrai si le fichier clients du jour est deja extrait dans cette version"""
+    return (os.path.exists(_clients_raw_path(date))
+            and is_unchanged(CLIENTS_FOLDER, date.strftime('%Y-%m-%d'), _snapshot_version(file_meta)))
 
-def extract_products(date: datetime, service=None):
+
+def _fetch_file_meta(service, file_id: str):
+    """Recupere uniquement la version (modifiedDate, md5Checksum) d'un fichier"""
+    file_obj = service.CreateFile({'id': file_id})
+    file_obj.FetchMetadata(fields='id,title,modifiedDate,md5Checksum')
+    return file_obj
+
+
+@instrumented()
+def extract_clients(date: datetime, service=None, incremental: bool = False):
     """
-    Extrait le fichier products.csv et filtre pour la date specifique
+    Extrait le fichier clients du jour depuis Google Drive
+    (incremental => pas de telechargement si le fichier Drive n'a pas change)
+    """
+    if service is None:
+        service = connect_to_drive()
+    
+    filename = f"clients_{date.strftime('%Y-%m-%d')}.csv"
+    
+    try:
+        file_id = _resolve_file_id(service, CLIENTS_FOLDER, filename)
+        if file_id is None:
+            print(f"Aucun fichier trouve avec le nom {filename}.")
+            return
+        file_meta = _fetch_file_meta(service, file_id) if incremental else None
+        if file_meta is not None and _client_file_unchanged(date, file_meta):
+            print(f"Fichier {filename} inchange, extraction ignoree")
+            return _clients_raw_path(date)
+        return _download_client_file(service, file_id, date, file_meta)
+    except ApiRequestError:
+        # Id en cache obsolete (fichier remplace/supprime) : on le resout a nouveau
+        cache_invalidate(CLIENTS_FOLDER, filename)
+        file_id = _resolve_file_id(service, CLIENTS_FOLDER, filename, refresh=True)
+        if file_id is None:
+            print(f"Aucun fichier trouve avec le nom {filename}.")
+            return
+        file_meta = _fetch_file_meta(service, file_id) if incremental else None
+        return _download_client_file(service, file_id, date, file_meta)
+
+
+@instrumented()
+def extract_clients_range(start: datetime, end: datetime, service=None, incremental: bool = False):
+    """
+    Extrait les fichiers clients de [start, end] avec un seul listage du dossier
     """
     if service is None:
         service = connect_to_drive()
     
-    filename = "products.csv"
+    files = _list_folder_files(service, CLIENTS_FOLDER)
     
-    # Recherche du fichier products.csv
+    paths = {}
+    day = start
+    while day <= end:
+        filename = f"clients_{day.strftime('%Y-%m-%d')}.csv"
+        if filename not in files:
+            print(f"Aucun fichier trouve avec le nom {filename}.")
+        elif incremental and _client_file_unchanged(day, files[filename]):
+            paths[day.strftime('%Y-%m-%d')] = _clients_raw_path(day)
+        else:
+            paths[day.strftime('%Y-%m-%d')] = _download_client_file(
+                service, files[filename]['id'], day, files[filename]
+            )
+        day += timedelta(days=1)
+    
+    print(f"Clients extraits sur {len(paths)} jours")
+    return paths
+
+
+def _http_status(exc):
+    """Code HTTP d'une erreur Drive (ApiRequestError ou HttpError)"""
+    error = getattr(exc, 'error', None)
+    if isinstance(error, dict) and error.get('code'):
+        return int(error['code'])
+    for candidate in (exc, *getattr(exc, 'args', ())):
+        status = getattr(getattr(candidate, 'resp', None), 'status', None)
+        if status:
+            return int(status)
+    return None
+
+
+def _download_with_retry(service, file_meta, date: datetime, max_retries: int = DRIVE_MAX_RETRIES):
+    """
+    Telecharge un fichier clients avec backoff exponentiel sur 429/5xx
+    Retourne un dictionnaire de statut avec la duree du telechargement
+    """
+    started = time.perf_counter()
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            path = _download_client_file(service, file_meta['id'], date, file_meta)
+            return {'date': date.strftime('%Y-%m-%d'), 'path': path, 'status': 'ok',
+                    'attempts': attempt, 'seconds': time.perf_counter() - started}
+        except Exception as e:
+            status = _http_status(e)
+            if status not in RETRYABLE_STATUSES or attempt > max_retries:
+                return {'date': date.strftime('%Y-%m-%d'), 'path': None, 'status': f"erreur: {e}",
+                        'attempts': attempt, 'seconds': time.perf_counter() - started}
+            delay = DRIVE_BACKOFF_BASE * (2 ** (attempt - 1)) * (1 + random.random())
+            print(f"HTTP {status} pour {date.strftime('%Y-%m-%d')}, nouvel essai dans {delay:.1f}s")
+            time.sleep(delay)
+
+
+@instrumented()
+def extract_clients_parallel(dates, service=None, max_workers: int = DRIVE_MAX_WORKERS, max_retries: int = DRIVE_MAX_RETRIES,
+                             incremental: bool = False):
+    """
+    Telecharge en parallele les fichiers clients de plusieurs jours
+    (pool de threads borne, retry avec backoff, duree par fichier)
+    """
+    if service is None:
+        service = connect_to_drive()
+    
+    files = _list_folder_files(service, CLIENTS_FOLDER)
+    
+    results = []
+    jobs = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for day in dates:
+            filename = f"clients_{day.strftime('%Y-%m-%d')}.csv"
+            if filename not in files:
+                results.append({'date': day.strftime('%Y-%m-%d'), 'path': None, 'status': 'absent',
+                                'attempts': 0, 'seconds': 0.0})
+                continue
+            if incremental and _client_file_unchanged(day, files[filename]):
+                results.append({'date': day.strftime('%Y-%m-%d'), 'path': _clients_raw_path(day),
+                                'status': 'inchange', 'attempts': 0, 'seconds': 0.0})
+                continue
+            jobs[submit_in_context(executor, _download_with_retry, service, files[filename], day, max_retries)] = day
+        
+        for future in as_completed(jobs):
+            results.append(future.result())
+    
+    results.sort(key=lambda r: r['date'])
+    print(f"{'date':<12}{'statut':<10}{'essais':>7}{'duree (s)':>11}")
+    for r in results:
+        print(f"{r['date']:<12}{r['status'][:9]:<10}{r['attempts']:>7}{r['seconds']:>11.2f}")
+    failed = [r['date'] for r in results if r['status'].startswith("erreur")]
+    if failed:
+        mark_failed(f"{len(failed)} telechargements en echec ({', '.join(failed)})")
+    return results
+
+
+def _find_products_file(service, filename: str = "products.csv"):
+    """Recherche les metadonnees Drive du fichier products.csv"""
     file_query = f"title='{filename}' and mimeType!='application/vnd.google-apps.folder' and trashed=false"
     files = service.ListFile({'q': file_query}).GetList()
+    return files[0] if files else None
+
+
+def _snapshot_version(file_meta):
+    """Version d'un fichier Drive : md5Checksum, sinon modifiedDate"""
+    version = file_meta.get('md5Checksum') or file_meta.get('modifiedDate') or "unknown"
+    return "".join(c if c.isalnum() else "_" for c in version)
+
+
+def _store_products_cache(cache_path: str, key, file_content: str):
+    """
+    Ecrit le snapshot en cache via un fichier temporaire propre au processus/thread,
+    puis supprime les versions precedentes du meme fichier (jamais les .part en cours)
+    """
+    os.makedirs(PRODUCTS_CACHE_DIR, exist_ok=True)
+    tmp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.part"
+    with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+        f.write(file_content)
+    try:
+        os.replace(tmp_path, cache_path)
+    except FileNotFoundError:
+        # Un autre ecrivain a deja publie (ou remplace) le cache
+        return
     
-    if not files:
-        print(f"Aucun fichier trouve avec le nom {filename}.")
+    current = os.path.basename(cache_path)
+    for old in os.listdir(PRODUCTS_CACHE_DIR):
+        if old.startswith(f"{key[0]}_") and old.endswith(".csv") and old != current:
+            try:
+                os.remove(os.path.join(PRODUCTS_CACHE_DIR, old))
+            except FileNotFoundError:
+                pass
+
+
+def load_products_snapshot(service=None, file_meta=None):
+    """
+    Charge products.csv une seule fois par version Drive et le partitionne par date
+    Retourne un dictionnaire {date 'YYYY-MM-DD': DataFrame}
+    """
+    if file_meta is None:
+        if service is None:
+            service = connect_to_drive()
+        file_meta = _find_products_file(service)
+        if file_meta is None:
+            return None
+    
+    key = (file_meta['id'], _snapshot_version(file_meta))
+    if key in _PRODUCTS_SNAPSHOTS:
+        return _PRODUCTS_SNAPSHOTS[key]
+    
+    # Cache disque partage entre les taches d'un meme worker
+    cache_path = os.path.join(PRODUCTS_CACHE_DIR, f"{key[0]}_{key[1]}.csv")
+    data = None
+    try:
+        data = pd.read_csv(cache_path)
+        record_read(data.shape[0], file_size(cache_path))
+        print(f"Snapshot produits lu depuis le cache : {cache_path}")
+    except FileNotFoundError:
+        pass
+    
+    if data is None:
+        if service is None:
+            service = connect_to_drive()
+        file_obj = service.CreateFile({'id': key[0]})
+        file_content = file_obj.GetContentString()
+        data = pd.read_csv(io.StringIO(file_content))
+        record_read(data.shape[0], len(file_content.encode("utf-8")))
+        
+        _store_products_cache(cache_path, key, file_content)
+        print(f"Snapshot produits telecharge : {cache_path}")
+    
+    partitions = {str(day): df_day for day, df_day in data.groupby('date', sort=True)}
+    _PRODUCTS_SNAPSHOTS.clear()
+    _PRODUCTS_SNAPSHOTS[key] = partitions
+    return partitions
+
+
+def _products_raw_path(date: datetime):
+    """Chemin du fichier raw des produits pour un jour"""
+    return os.path.join(f"{RAW_DATA_DIR}/products/{date.year}/{date.month}", f"{date.day}.csv")
+
+
+def _write_products_day(df, date: datetime, file_meta):
+    """Ecrit les produits d'un jour dans le fichier raw correspondant"""
+    local_path = _products_raw_path(date)
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    df.to_csv(local_path, index=False)
+    record_write(df.shape[0], file_size(local_path))
+    set_state("products", date.strftime("%Y-%m-%d"),
+              watermark=file_meta.get('modifiedDate'), checksum=_snapshot_version(file_meta))
+    print(f"Produits filtres sauvegardes : {local_path}")
+    return local_path
+
+
+def _products_day_unchanged(date: datetime, file_meta):
+    """Vrai si les produits du jour sont deja extraits depuis cette version de products.csv"""
+    return (os.path.exists(_products_raw_path(date))
+            and is_unchanged("products", date.strftime("%Y-%m-%d"), _snapshot_version(file_meta)))
+
+
+@instrumented()
+def extract_products(date: datetime, service=None, incremental: bool = False):
+    """
+    Extrait le fichier products.csv et filtre pour la date specifique
+    (incremental => rien a faire si products.csv n'a pas change)
+    """
+    if service is None:
+        service = connect_to_drive()
+    
+    file_meta = _find_products_file(service)
+    if file_meta is None:
+        print("Aucun fichier trouve avec le nom products.csv.")
         return
     
-    # Telechargement en memoire
-    file_obj = service.CreateFile({'id': files[0]['id']})
-    file_content = file_obj.GetContentString()
+    if incremental and _products_day_unchanged(date, file_meta):
+        print("products.csv inchange, extraction ignoree")
+        return _products_raw_path(date)
     
-    # CORRECTION: Utiliser io.StringIO au lieu de pandas.compat.StringIO
-    data = pd.read_csv(io.StringIO(file_content))  # ← Ligne corrigée
-    final_data = data[data.date == date.strftime("%Y-%m-%d")]
+    partitions = load_products_snapshot(service, file_meta)
+    final_data = partitions.get(date.strftime("%Y-%m-%d"))
     
-    if final_data.shape[0] > 0:
-        local_path = os.path.join(f"{RAW_DATA_DIR}/products/{date.year}/{date.month}", f"{date.day}.csv")
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        final_data.to_csv(local_path, index=False)
-        print(f"Produits filtres sauvegardes : {local_path}")
+    if final_data is not None and final_data.shape[0] > 0:
+        return _write_products_day(final_data, date, file_meta)
+
+
+@instrumented()
+def extract_products_range(start: datetime, end: datetime, service=None, incremental: bool = False):
+    """
+    Ecrit en une passe les fichiers produits raw de tous les jours de [start, end]
+    a partir d'un seul telechargement de products.csv
+    """
+    if service is None:
+        service = connect_to_drive()
+    
+    file_meta = _find_products_file(service)
+    if file_meta is None:
+        print("Aucun fichier trouve avec le nom products.csv.")
+        return {}
+    
+    partitions = load_products_snapshot(service, file_meta)
+    
+    start_str, end_str = start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")
+    paths = {}
+    for date_str, df_day in partitions.items():
+        if start_str <= date_str <= end_str and df_day.shape[0] > 0:
+            day = datetime.strptime(date_str, "%Y-%m-%d")
+            if incremental and _products_day_unchanged(day, file_meta):
+                paths[date_str] = _products_raw_path(day)
+            else:
+                paths[date_str] = _write_products_day(df_day, day, file_meta)
+    
+    print(f"Produits extraits sur {len(paths)} jours")
+    return paths
+
+
+def ensure_order_date_index(db_path: str, table_name: str = "ecommerce_orders"):
+    """
+    Cree l'index sur order_date s'il n'existe pas encore (evite le full scan)
+    via une connexion en ecriture dediee, une seule fois par processus
+    """
+    ensure_index(
+        db_path,
+        f"idx_{table_name}_order_date",
+        f"CREATE INDEX IF NOT EXISTS idx_{table_name}_order_date ON {table_name}(order_date)",
+    )
+
+
+def _orders_raw_path(date: datetime):
+    """Chemin du fichier raw des commandes pour un jour"""
+    local_path = os.path.join(f"{RAW_DATA_DIR}/orders/{date.year}/{date.month}", f"{date.day}.csv")
+    os.makedirs(os.path.dirname(local_path), exist_ok=True)
+    return local_path
+
+
+def _write_orders_day(df, date: datetime, table_name: str = "ecommerce_orders", append: bool = False):
+    """Ecrit (ou complete) les commandes d'un jour dans le fichier raw correspondant"""
+    local_path = _orders_raw_path(date)
+    size_before = file_size(local_path) if append else 0
+    if append:
+        df.to_csv(local_path, index=False, mode="a", header=False)
+    else:
+        df.to_csv(local_path, index=False)
+    record_write(df.shape[0], file_size(local_path) - size_before)
+    set_state(table_name, date.strftime("%Y-%m-%d"), watermark=int(df['order_id'].max()))
+    print(f"Commandes extraites : {local_path}")
+    return local_path
 
 
-def extract_orders(date: datetime, db_path: str = "ecommerce_orders_may2024.db", table_name: str="ecommerce_orders"):
+def _orders_watermark(date: datetime, table_name: str):
+    """
+    Plus grand order_id deja extrait pour ce jour (None si le fichier raw est absent)
+    """
+    if not os.path.exists(_orders_raw_path(date)):
+        return None
+    state = get_state(table_name, date.strftime("%Y-%m-%d"))
+    if state is None or state['watermark'] is None:
+        return None
+    return int(state['watermark'])
+
+
+def _orders_day_query(table_name: str, date: datetime, after_id=None):
+    """Requete parametree des commandes d'un jour (au-dela du watermark si fourni)"""
+    query = f"SELECT * FROM {table_name} WHERE order_date = ?"
+    params = [date.strftime("%Y-%m-%d")]
+    if after_id is not None:
+        query += " AND order_id > ?"
+        params.append(after_id)
+    return query + " ORDER BY order_id", tuple(params)
+
+
+@instrumented()
+def extract_orders(date: datetime, db_path: str = "ecommerce_orders_may2024.db", table_name: str="ecommerce_orders", chunksize: int = None,
+                   incremental: bool = False):
     """
     Extrait les commandes du jour depuis la base SQLite locale
+    (chunksize renseigne => lecture en streaming par blocs,
+     incremental => seules les commandes au-dela du watermark sont ajoutees)
     """
-    conn = sqlite3.connect(db_path)
-    try:
-        date_str = date.strftime("%Y-%m-%d")
-        df = pd.read_sql_query(f'SELECT * FROM {table_name} where order_date="{date_str}" ', conn)
-    finally:
-        conn.close()
+    after_id = _orders_watermark(date, table_name) if incremental else None
+    
+    if chunksize:
+        return extract_orders_stream(date, db_path, table_name, chunksize, after_id=after_id)
+    
+    ensure_order_date_index(db_path, table_name)
+    query, params = _orders_day_query(table_name, date, after_id)
+    df = pd.read_sql_query(query, get_read_connection(db_path), params=params)
+    record_read(df.shape[0])
     
     if df.shape[0] > 0:
-        local_path = os.path.join(f"{RAW_DATA_DIR}/orders/{date.year}/{date.month}", f"{date.day}.csv")
-        os.makedirs(os.path.dirname(local_path), exist_ok=True)
-        df.to_csv(local_path, index=False)
-        print(f"Commandes extraites : {local_path}")
+        return _write_orders_day(df, date, table_name, append=after_id is not None)
+    if after_id is not None:
+        print(f"Aucune nouvelle commande pour {date.strftime('%Y-%m-%d')} (watermark {after_id})")
+        return _orders_raw_path(date)
+
+
+def extract_orders_stream(date: datetime, db_path: str = "ecommerce_orders_may2024.db", table_name: str="ecommerce_orders", chunksize: int = ORDERS_CHUNK_SIZE,
+                          after_id: int = None):
+    """
+    Extrait les commandes du jour par blocs de `chunksize` lignes,
+    ajoutes au fichier raw au fur et a mesure (memoire bornee)
+    """
+    local_path = None
+    tmp_path = None
+    total_rows = 0
+    max_order_id = None
+    ensure_order_date_index(db_path, table_name)
+    try:
+        query, params = _orders_day_query(table_name, date, after_id)
+        chunks = pd.read_sql_query(query, get_read_connection(db_path), params=params, chunksize=chunksize)
+        for chunk in chunks:
+            if chunk.empty:
+                continue
+            if tmp_path is None:
+                local_path = _orders_raw_path(date)
+                tmp_path = f"{local_path}.part"
+                chunk.to_csv(tmp_path, index=False, mode="w", header=after_id is None)
+            else:
+                chunk.to_csv(tmp_path, index=False, mode="a", header=False)
+            total_rows += chunk.shape[0]
+            record_read(chunk.shape[0])
+            max_order_id = int(chunk['order_id'].max())
+    except Exception:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    
+    if tmp_path is None:
+        if after_id is not None:
+            print(f"Aucune nouvelle commande pour {date.strftime('%Y-%m-%d')} (watermark {after_id})")
+            return _orders_raw_path(date)
+        return None
+    
+    # Le fichier final n'apparait (ou n'est complete) qu'une fois tous les chunks ecrits
+    record_write(total_rows, file_size(tmp_path))
+    if after_id is None:
+        os.replace(tmp_path, local_path)
+    else:
+        with open(tmp_path, "rb") as src, open(local_path, "ab") as dst:
+            shutil.copyfileobj(src, dst)
+        os.remove(tmp_path)
+    set_state(table_name, date.strftime("%Y-%m-%d"), watermark=max_order_id)
+    print(f"Commandes extraites ({total_rows} lignes, chunks de {chunksize}) : {local_path}")
+    return local_path
+
+
+@instrumented()
+def extract_orders_range(start: datetime, end: datetime, db_path: str = "ecommerce_orders_may2024.db", table_name: str="ecommerce_orders"):
+    """
+    Extrait les commandes d'une periode [start, end] en une seule requete
+    puis decoupe le resultat en fichiers raw journaliers
+    """
+    ensure_order_date_index(db_path, table_name)
+    df = pd.read_sql_query(
+        f"SELECT * FROM {table_name} WHERE order_date BETWEEN ? AND ? ORDER BY order_date",
+        get_read_connection(db_path),
+        params=(start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")),
+    )
+    record_read(df.shape[0])
+    
+    paths = {}
+    for date_str, df_day in df.groupby("order_date", sort=True):
+        day = datetime.strptime(date_str, "%Y-%m-%d")
+        paths[date_str] = _write_orders_day(df_day, day, table_name)
+    
+    print(f"{df.shape[0]} commandes extraites sur {len(paths)} jours")
+    return paths
 
 if __name__ == "__main__":
     # Tests
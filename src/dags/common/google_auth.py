@@ -1,6 +1,60 @@
 from pydrive2.auth import GoogleAuth
 from pydrive2.drive import GoogleDrive
+from contextlib import contextmanager
+from datetime import datetime, timedelta
 import os
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows : verrou inter-processus indisponible
+    fcntl = None
+
+CLIENT_SECRET_PATH = 'client_secret.json'
+CREDENTIALS_PATH = 'credentials.json'
+TOKEN_REFRESH_MARGIN = timedelta(minutes=5)  # rafraichir le token avant expiration
+
+# Session Drive partagee par le processus
+_session_lock = threading.Lock()
+_credentials_lock = threading.Lock()
+_drive_session = None
+
+
+@contextmanager
+def _credentials_file_lock():
+    """
+    Verrou sur credentials.json (threads du processus + autres processus du worker)
+    """
+    with _credentials_lock:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{CREDENTIALS_PATH}.lock", "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _save_credentials(gauth):
+    """Ecrit credentials.json sous verrou, via un fichier temporaire"""
+    with _credentials_file_lock():
+        tmp_path = f"{CREDENTIALS_PATH}.{os.getpid()}.tmp"
+        gauth.SaveCredentialsFile(tmp_path)
+        os.replace(tmp_path, CREDENTIALS_PATH)
+
+
+def _token_expires_soon(gauth):
+    """Vrai si le token est absent, expire ou proche de l'expiration"""
+    if gauth.credentials is None:
+        return True
+    expiry = getattr(gauth.credentials, 'token_expiry', None)
+    if expiry is None:
+        return gauth.access_token_expired
+    # token_expiry est un datetime UTC naif (oauth2client)
+    return expiry - datetime.utcnow() < TOKEN_REFRESH_MARGIN
+
 
 def get_google_drive_service():
     """
@@ -10,37 +64,54 @@ def get_google_drive_service():
     try:
         gauth = GoogleAuth()
         
-        if not os.path.exists('client_secret.json'):
+        if not os.path.exists(CLIENT_SECRET_PATH):
             raise FileNotFoundError("client_secret.json introuvable")
         
-        gauth.LoadClientConfigFile('client_secret.json')
+        gauth.LoadClientConfigFile(CLIENT_SECRET_PATH)
         
-        if os.path.exists('credentials.json'):
-            gauth.LoadCredentialsFile('credentials.json')
+        with _credentials_file_lock():
+            if os.path.exists(CREDENTIALS_PATH):
+                gauth.LoadCredentialsFile(CREDENTIALS_PATH)
         
         if gauth.credentials is None:
             print("Authentification requise - ouverture navigateur...")
             gauth.LocalWebserverAuth()
-        elif gauth.access_token_expired:
+            _save_credentials(gauth)
+        elif _token_expires_soon(gauth):
             gauth.Refresh()
+            _save_credentials(gauth)
         else:
             gauth.Authorize()
         
-        gauth.SaveCredentialsFile('credentials.json')
-        
         return GoogleDrive(gauth)
         
     except Exception as e:
         print(f"Erreur d'authentification Google Drive: {e}")
         raise
 
+
+def get_drive_session(force_refresh=False):
+    """
+    Retourne la session GoogleDrive du processus (creee une seule fois)
+    Le token n'est rafraichi que lorsqu'il approche de son expiration
+    """
+    global _drive_session
+    with _session_lock:
+        if _drive_session is None or force_refresh:
+            _drive_session = get_google_drive_service()
+        elif _token_expires_soon(_drive_session.auth):
+            _drive_session.auth.Refresh()
+            _save_credentials(_drive_session.auth)
+        return _drive_session
+
+
 def test_connection():
     """Test simple de connexion"""
     try:
-        drive = get_google_drive_service()
+        drive = get_drive_session()
         files = drive.ListFile({'q': "'root' in parents and trashed=false"}).GetList()
         print(f"Connecte! {len(files)} fichiers a la racine")
         return True
     except Exception as e:
         print(f"Echec connexion: {e}")
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,234 @@
+import contextvars
+import functools
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure du pic mémoire
+    resource = None
+
+# Mesures par étape et par date, une ligne JSON par exécution d'étape
+STAGE_METRICS_PATH = os.environ.get(
+    "ECOMMERCE_STAGE_METRICS", os.path.join("data", "logs", "stage_metrics.jsonl")
+)
+INSTRUMENTATION_ENABLED = os.environ.get("ECOMMERCE_INSTRUMENTATION", "1") != "0"
+
+COUNTERS = ('rows_in', 'rows_out', 'bytes_read', 'bytes_written')
+
+# Etapes actives du contexte courant (les lectures/écritures comptent pour toutes)
+_active_stages = contextvars.ContextVar('active_stages', default=())
+_write_lock = threading.Lock()
+_count_lock = threading.Lock()
+
+# Pic RSS par étape (Linux) : le pic du processus (VmHWM) est remis à zéro au début
+# de chaque étape, après avoir été reporté sur toutes les étapes ouvertes du processus
+_open_stages = {}  # id(record) -> record
+_rss_lock = threading.Lock()
+_process_hwm_kb = 0  # pic du processus conservé à travers les remises à zéro
+
+
+def _process_peak_rss_mb():
+    """Pic de mémoire résidente du processus depuis son démarrage (Mo), None si indisponible"""
+    if _process_hwm_kb:
+        # ru_maxrss suit VmHWM et a donc été remis à zéro avec lui
+        with _rss_lock:
+            _fold_hwm([])
+            return round(_process_hwm_kb / 1024, 1)
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss : octets sous macOS, kilo-octets sous Linux
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def _read_hwm_kb():
+    """Pic RSS courant (VmHWM, Ko) depuis la dernière remise à zéro, None hors Linux"""
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            match = re.search(r"^VmHWM:\s+(\d+)", f.read(), re.MULTILINE)
+    except OSError:
+        return None
+    return int(match.group(1)) if match else None
+
+
+def _reset_hwm():
+    """Remet VmHWM au RSS courant ; faux si le noyau ne le permet pas"""
+    try:
+        with open("/proc/self/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def _fold_hwm(records):
+    """Reporte le pic courant sur les étapes données (et sur le pic du processus)"""
+    global _process_hwm_kb
+    hwm = _read_hwm_kb()
+    if hwm is None:
+        return
+    _process_hwm_kb = max(_process_hwm_kb, hwm)
+    for record in records:
+        record['_hwm_kb'] = max(record.get('_hwm_kb', 0), hwm)
+
+
+def _open_rss_window(record):
+    """Début d'étape : le pic en cours est conservé par les étapes ouvertes, puis remis à zéro"""
+    with _rss_lock:
+        _fold_hwm(_open_stages.values())
+        if _reset_hwm():
+            _fold_hwm([record])
+            _open_stages[id(record)] = record
+
+
+def _close_rss_window(record):
+    """Fin d'étape : pic propre à l'étape (Mo), None si non mesurable"""
+    with _rss_lock:
+        if id(record) not in _open_stages:
+            return None
+        _fold_hwm(_open_stages.values())
+        del _open_stages[id(record)]
+    return round(record.pop('_hwm_kb') / 1024, 1)
+
+
+def _emit(record):
+    """Ajoute une ligne JSON au fichier de mesures (écriture unique en mode ajout)"""
+    directory = os.path.dirname(STAGE_METRICS_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+    with _write_lock:
+        with open(STAGE_METRICS_PATH, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+def _count(**amounts):
+    """Ajoute des quantités aux compteurs de toutes les étapes actives"""
+    records = _active_stages.get()
+    if not records:
+        return
+    with _count_lock:
+        for record in records:
+            for name, value in amounts.items():
+                record[name] += int(value or 0)
+
+
+def record_read(rows=0, nbytes=0):
+    """Comptabilise une lecture (lignes, octets) pour les étapes en cours"""
+    _count(rows_in=rows, bytes_read=nbytes)
+
+
+def record_write(rows=0, nbytes=0):
+    """Comptabilise une écriture (lignes, octets) pour les étapes en cours"""
+    _count(rows_out=rows, bytes_written=nbytes)
+
+
+def mark_failed(error):
+    """
+    Marque en échec l'étape en cours (erreur interceptée par la fonction d'étape,
+    qui retourne alors un résultat vide au lieu de lever l'exception)
+    """
+    records = _active_stages.get()
+    if records:
+        records[-1]['status'] = f"erreur: {error}"
+
+
+def submit_in_context(executor, func, *args, **kwargs):
+    """
+    executor.submit dans une copie du contexte courant : les lectures/écritures
+    du thread de travail sont comptées pour les étapes en cours
+    (une écriture terminée après la fin de l'étape n'est plus comptée)
+    """
+    return executor.submit(contextvars.copy_context().run, func, *args, **kwargs)
+
+
+def file_size(path):
+    """Taille d'un fichier (0 s'il n'existe pas)"""
+    try:
+        return os.path.getsize(path)
+    except OSError:
+        return 0
+
+
+@contextmanager
+def stage(name, date=None):
+    """
+    Mesure une étape : durée, lignes lues/écrites, octets lus/écrits,
+    pic RSS de l'étape (peak_rss_mb, Linux) et du processus (process_peak_rss_mb)
+    Le dictionnaire de mesures est fourni au bloc et émis en JSON à la sortie
+    """
+    if isinstance(date, datetime):
+        date = date.strftime('%Y-%m-%d')
+    record = {
+        'stage': name,
+        'date': date,
+        'started_at': datetime.now().isoformat(timespec='seconds'),
+        'pid': os.getpid(),
+        **{counter: 0 for counter in COUNTERS},
+    }
+    if not INSTRUMENTATION_ENABLED:
+        yield record
+        return
+
+    token = _active_stages.set(_active_stages.get() + (record,))
+    record['status'] = 'ok'
+    _open_rss_window(record)
+    started = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record['status'] = f"erreur: {e}"
+        raise
+    finally:
+        _active_stages.reset(token)
+        record['wall_s'] = round(time.perf_counter() - started, 4)
+        record['peak_rss_mb'] = _close_rss_window(record)
+        record['process_peak_rss_mb'] = _process_peak_rss_mb()
+        _emit(record)
+
+
+def _stage_date(signature, args, kwargs):
+    """Date (ou mois, ou début de période) passée à une fonction d'étape"""
+    try:
+        arguments = signature.bind_partial(*args, **kwargs).arguments
+    except TypeError:
+        return None
+    for key in ('date', 'month_year', 'start'):
+        if arguments.get(key) is not None:
+            return arguments[key]
+    return None
+
+
+def instrumented(name=None):
+    """
+    Décorateur d'étape : chaque appel est mesuré (voir stage) sous le nom
+    `name` (par défaut le nom de la fonction) pour la date reçue en argument
+    """
+    def decorator(func):
+        stage_name = name or func.__name__
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with stage(stage_name, _stage_date(signature, args, kwargs)):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def load_stage_metrics(path=None):
+    """Relit le fichier de mesures sous forme de DataFrame (une ligne par étape exécutée)"""
+    import pandas as pd
+    path = path or STAGE_METRICS_PATH
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['stage', 'date', *COUNTERS, 'wall_s', 'peak_rss_mb',
+                                     'process_peak_rss_mb', 'status'])
+    return pd.read_json(path, lines=True)
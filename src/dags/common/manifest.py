@@ -0,0 +1,74 @@
+import os
+import sqlite3
+from datetime import datetime
+
+# Manifeste des sorties du pipeline : empreinte du contenu et taille de chaque fichier ecrit
+MANIFEST_DB_PATH = os.path.join("data", "output_manifest.db")
+
+
+def _connect():
+    """Ouvre la base du manifeste (creee a la volee)"""
+    os.makedirs(os.path.dirname(MANIFEST_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(MANIFEST_DB_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS outputs (
+            path TEXT PRIMARY KEY,
+            checksum TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+    """)
+    return conn
+
+
+def _key(path):
+    """Cle normalisee d'un chemin de sortie"""
+    return os.path.normpath(path)
+
+
+def get_output(path):
+    """Entree du manifeste {'checksum', 'size', 'updated_at'} ou None"""
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT checksum, size, updated_at FROM outputs WHERE path = ?",
+            (_key(path),),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {'checksum': row[0], 'size': row[1], 'updated_at': row[2]}
+
+
+def record_output(path, checksum):
+    """Enregistre l'empreinte et la taille d'un fichier qui vient d'etre ecrit"""
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO outputs (path, checksum, size, updated_at)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT (path) DO UPDATE SET
+                    checksum = excluded.checksum,
+                    size = excluded.size,
+                    updated_at = excluded.updated_at
+                """,
+                (_key(path), checksum, os.path.getsize(path),
+                 datetime.now().isoformat(timespec='seconds')),
+            )
+    finally:
+        conn.close()
+
+
+def is_output_unchanged(path, checksum):
+    """
+    Vrai si le fichier existe, a la taille enregistree (pas de fichier tronque)
+    et a deja ete ecrit avec ce meme contenu
+    """
+    if not os.path.exists(path):
+        return False
+    entry = get_output(path)
+    return (entry is not None and entry['checksum'] == checksum
+            and entry['size'] == os.path.getsize(path))
@@ -4,6 +4,10 @@ from datetime import datetime, timedelta
 import os
 import sqlite3
 import shutil
+from .storage import read_table, table_exists, write_table, list_tables
+from .cube import load_daily_cube, cube_totals, load_month_totals, CUBE_DIR
+from .rollup import record_daily_metrics, monthly_totals, load_daily_metrics
+from .instrument import instrumented, mark_failed
 
 def ensure_directory_exists(file_path):
     """Crée automatiquement le dossier s'il n'existe pas"""
@@ -36,6 +40,62 @@ def fix_directory_names():
     
     return True
 
+def daily_metrics_path(date):
+    """Chemin (format CSV de référence) du fichier de métriques quotidiennes"""
+    return f"data/metrics/daily/{date.year}/{date.month}/{date.day}.csv"
+
+def compute_daily_metrics(date, df_clients, df_products, df_orders):
+    """
+    Calcule les métriques quotidiennes à partir de DataFrames enrichis en mémoire
+    """
+    # 1. STOCK DISPONIBLE (global car pas de store_id dans vos données)
+    stock_metrics = {}
+    total_stock = df_products['stock'].sum() if 'stock' in df_products.columns else 0
+    stock_metrics['stock_global'] = total_stock
+    
+    # 2. NOMBRE DE CLIENTS (global car pas de store_id)
+    client_metrics = {}
+    total_clients = df_clients['customer_id'].nunique() if 'customer_id' in df_clients.columns else 0
+    client_metrics['clients_global'] = total_clients
+    
+    # 3. CHIFFRE D'AFFAIRES du jour
+    daily_revenue = 0
+    if 'total_amount' in df_orders.columns:
+        daily_revenue = df_orders['total_amount'].sum()
+    elif 'price' in df_orders.columns and 'quantity' in df_orders.columns:
+        daily_revenue = (df_orders['price'] * df_orders['quantity']).sum()
+    
+    return {
+        'date': date.strftime('%Y-%m-%d'),
+        **stock_metrics,
+        **client_metrics,
+        'daily_revenue': daily_revenue
+    }
+
+def metrics_from_cube(date, cube):
+    """
+    Métriques quotidiennes lues dans la ligne 'total' du cube (cube.py)
+    """
+    total = cube_totals(cube)
+    return {
+        'date': date.strftime('%Y-%m-%d'),
+        'stock_global': int(total.get('stock', 0) or 0),
+        'clients_global': int(total.get('clients', 0) or 0),
+        'daily_revenue': total.get('revenue', 0),
+    }
+
+def save_daily_metrics(date, daily_metrics):
+    """
+    Sauvegarde les métriques quotidiennes (mois sans zéro)
+    et les ajoute à la table de rollup (agrégat mensuel mis à jour)
+    """
+    ensure_directory_exists(daily_metrics_path(date))
+    metrics_df = pd.DataFrame([daily_metrics])
+    path = write_table(metrics_df, daily_metrics_path(date), 'daily_metrics')
+    record_daily_metrics(daily_metrics)
+    return path
+
+@instrumented()
 def calculate_daily_metrics(date):
     """
     Calcule les métriques quotidiennes demandées
@@ -43,57 +103,100 @@ def calculate_daily_metrics(date):
     - Nombre de clients par magasin/site
     """
     try:
-        # Utiliser le mois sans zéro (5 au lieu de 05)
+        # Lecture de la ligne 'total' du cube quotidien (colonnes utiles seulement) s'il existe
+        cube = load_daily_cube(date, dimension='total', columns=['revenue', 'stock', 'clients'])
+        if cube is not None:
+            daily_metrics = metrics_from_cube(date, cube)
+            save_daily_metrics(date, daily_metrics)
+            print(f"✅ Métriques quotidiennes calculées pour {date} (cube)")
+            return daily_metrics
+        
+        # À défaut, relecture des fichiers enrichis (mois sans zéro : 5 au lieu de 05)
         enriched_path = f"data/enriched_data/{date.year}/{date.month}/"
         clients_path = f"{enriched_path}clients_{date.day}.csv"
         products_path = f"{enriched_path}products_{date.day}.csv"
         orders_path = f"{enriched_path}orders_{date.day}.csv"
         
-        if not all(os.path.exists(p) for p in [clients_path, products_path, orders_path]):
+        if not all(table_exists(p) for p in [clients_path, products_path, orders_path]):
             print(f"Données manquantes pour le {date}")
             return {}
         
-        df_clients = pd.read_csv(clients_path)
-        df_products = pd.read_csv(products_path)
-        df_orders = pd.read_csv(orders_path)
-        
-        # 1. STOCK DISPONIBLE (global car pas de store_id dans vos données)
-        stock_metrics = {}
-        total_stock = df_products['stock'].sum() if 'stock' in df_products.columns else 0
-        stock_metrics['stock_global'] = total_stock
+        # Projection : seules les colonnes utiles aux métriques sont lues
+        df_clients = read_table(clients_path, columns=['customer_id'], entity='clients')
+        df_products = read_table(products_path, columns=['stock'], entity='products')
+        df_orders = read_table(orders_path, columns=['total_amount', 'price', 'quantity'], entity='orders')
         
-        # 2. NOMBRE DE CLIENTS (global car pas de store_id)
-        client_metrics = {}
-        total_clients = df_clients['customer_id'].nunique() if 'customer_id' in df_clients.columns else 0
-        client_metrics['clients_global'] = total_clients
-        
-        # 3. CHIFFRE D'AFFAIRES du jour
-        daily_revenue = 0
-        if 'total_amount' in df_orders.columns:
-            daily_revenue = df_orders['total_amount'].sum()
-        elif 'price' in df_orders.columns and 'quantity' in df_orders.columns:
-            daily_revenue = (df_orders['price'] * df_orders['quantity']).sum()
+        daily_metrics = compute_daily_metrics(date, df_clients, df_products, df_orders)
         
         # Sauvegarder les métriques quotidiennes
-        daily_metrics = {
-            'date': date.strftime('%Y-%m-%d'),
-            **stock_metrics,
-            **client_metrics,
-            'daily_revenue': daily_revenue
-        }
-        
-        # Utiliser le mois sans zéro
-        metrics_dir = ensure_directory_exists(f"data/metrics/daily/{date.year}/{date.month}/")
-        metrics_df = pd.DataFrame([daily_metrics])
-        metrics_df.to_csv(f"{metrics_dir}{date.day}.csv", index=False)
+        save_daily_metrics(date, daily_metrics)
         
         print(f"✅ Métriques quotidiennes calculées pour {date}")
         return daily_metrics
         
     except Exception as e:
         print(f"❌ Erreur calcul métriques quotidiennes: {e}")
+        mark_failed(e)
         return {}
 
+def _save_monthly_metrics(month_year, year, dates, revenues):
+    """
+    Agrège les CA quotidiens d'un mois et sauvegarde les métriques mensuelles
+    """
+    monthly_revenue = 0
+    for revenue in revenues:
+        monthly_revenue += revenue
+    
+    # Créer le résultat
+    monthly_metrics = {
+        'month': month_year, 
+        'total_revenue': monthly_revenue,
+        'days_count': len(dates),
+        'avg_daily_revenue': monthly_revenue / len(dates) if dates else 0
+    }
+    return _write_monthly_metrics(month_year, year, monthly_metrics)
+
+def _write_monthly_metrics(month_year, year, monthly_metrics):
+    """Sauvegarde des métriques mensuelles déjà agrégées"""
+    monthly_revenue = monthly_metrics['total_revenue']
+    if monthly_revenue == 0:
+        print(f"⚠️  Aucun chiffre d'affaires trouvé pour {month_year}")
+        return {'month': month_year, 'total_revenue': 0}
+    
+    print(f"   ✅ CA MENSUEL TOTAL: {monthly_revenue:.2f}€")
+    print(f"   📅 Jours avec données: {monthly_metrics['days_count']}")
+    
+    # Sauvegarder les métriques mensuelles
+    metrics_dir = ensure_directory_exists(f"data/metrics/monthly/{year}/")
+    metrics_df = pd.DataFrame([monthly_metrics])
+    metrics_file = write_table(metrics_df, f"{metrics_dir}{month_year}.csv", 'monthly_metrics')
+    
+    print(f"💾 Fichier sauvegardé: {metrics_file}")
+    
+    return monthly_metrics
+
+def _sync_month_rollup(year, month):
+    """
+    Ajoute au rollup les journées du mois dont le fichier de métriques quotidiennes
+    existe mais qui n'y figurent pas (journées calculées avant la table de rollup)
+    Retourne le nombre de journées ajoutées
+    """
+    month_key = f"{year}-{int(month):02d}"
+    known = set(load_daily_metrics(f"{month_key}-01", f"{month_key}-31")['date'])
+    added = 0
+    for day, path in list_tables(f"data/metrics/daily/{year}/{int(month)}/").items():
+        if not day.isdigit() or f"{month_key}-{int(day):02d}" in known:
+            continue
+        df_day = read_table(path, columns=['date', 'stock_global', 'clients_global', 'daily_revenue'])
+        if df_day.empty or 'daily_revenue' not in df_day.columns:
+            continue
+        daily_metrics = df_day.iloc[0].fillna(0).to_dict()
+        daily_metrics['date'] = f"{month_key}-{int(day):02d}"
+        record_daily_metrics(daily_metrics)
+        added += 1
+    return added
+
+@instrumented()
 def calculate_monthly_revenue(month_year):
     """
     Calcule le chiffre d'affaires mensuel - Version corrigée
@@ -102,6 +205,26 @@ def calculate_monthly_revenue(month_year):
         year, month_str = month_year.split('-')
         month = str(int(month_str))  # Convertir "05" en "5"
         
+        # Agrégat mensuel tenu à jour à chaque journée calculée, complété des journées
+        # calculées avant la table de rollup ; utilisé s'il couvre toutes les journées du mois
+        added = _sync_month_rollup(year, month)
+        if added:
+            print(f"   ➕ {added} journées ajoutées au rollup depuis les métriques quotidiennes")
+        monthly_metrics = monthly_totals(f"{year}-{int(month_str):02d}")
+        cube_days = len(list_tables(os.path.join(CUBE_DIR, year, month)))
+        if monthly_metrics and monthly_metrics['days_count'] >= cube_days:
+            monthly_metrics['month'] = month_year
+            return _write_monthly_metrics(month_year, year, monthly_metrics)
+        if monthly_metrics:
+            print(f"⚠️  Rollup incomplet pour {month_year} ({monthly_metrics['days_count']} jours, "
+                  f"{cube_days} cubes) : recalcul depuis les cubes quotidiens")
+        
+        # Journées calculées avant la table de rollup : lignes 'total' des cubes quotidiens
+        totals = load_month_totals(year, month)
+        if not totals.empty:
+            return _save_monthly_metrics(month_year, year, totals['date'].astype(str).tolist(),
+                                         totals['revenue'].astype(float).tolist())
+        
         # Essayer avec et sans zéro pour trouver le bon dossier
         possible_paths = [
             f"data/metrics/daily/{year}/{month}/",           # Sans zéro (5)
@@ -120,7 +243,8 @@ def calculate_monthly_revenue(month_year):
             print(f"   Chemins testés: {possible_paths}")
             return {'month': month_year, 'total_revenue': 0}
         
-        daily_files = [f for f in os.listdir(daily_metrics_dir) if f.endswith('.csv')]
+        daily_tables = list_tables(daily_metrics_dir)
+        daily_files = list(daily_tables)
         
         if not daily_files:
             print(f"❌ Aucun fichier de métriques quotidiennes pour {month_year}")
@@ -135,15 +259,14 @@ def calculate_monthly_revenue(month_year):
         
         for file in daily_files:
             try:
-                file_path = os.path.join(daily_metrics_dir, file)
-                df_day = pd.read_csv(file_path)
+                df_day = read_table(daily_tables[file], columns=['date', 'daily_revenue'])
                 
                 if not df_day.empty and 'daily_revenue' in df_day.columns:
                     daily_revenue = float(df_day['daily_revenue'].iloc[0])
                     monthly_revenue += daily_revenue
                     
                     daily_info = {
-                        'date': df_day['date'].iloc[0] if 'date' in df_day.columns else file.replace('.csv', ''),
+                        'date': df_day['date'].iloc[0] if 'date' in df_day.columns else file,
                         'daily_revenue': daily_revenue
                     }
                     daily_data.append(daily_info)
@@ -154,34 +277,12 @@ def calculate_monthly_revenue(month_year):
                 print(f"   ⚠️  Erreur avec {file}: {e}")
                 continue
         
-        if monthly_revenue == 0:
-            print(f"⚠️  Aucun chiffre d'affaires trouvé pour {month_year}")
-            return {'month': month_year, 'total_revenue': 0}
-        
-        print(f"   ✅ CA MENSUEL TOTAL: {monthly_revenue:.2f}€")
-        print(f"   📅 Jours avec données: {len(daily_data)}")
-        
-        # Créer le résultat
-        monthly_metrics = {
-            'month': month_year, 
-            'total_revenue': monthly_revenue,
-            'days_count': len(daily_data),
-            'avg_daily_revenue': monthly_revenue / len(daily_data) if daily_data else 0
-        }
-        
-        # Sauvegarder les métriques mensuelles
-        metrics_dir = ensure_directory_exists(f"data/metrics/monthly/{year}/")
-        metrics_file = f"{metrics_dir}{month_year}.csv"
-        
-        metrics_df = pd.DataFrame([monthly_metrics])
-        metrics_df.to_csv(metrics_file, index=False)
-        
-        print(f"💾 Fichier sauvegardé: {metrics_file}")
-        
-        return monthly_metrics
+        return _save_monthly_metrics(month_year, year, [d['date'] for d in daily_data],
+                                     [d['daily_revenue'] for d in daily_data])
         
     except Exception as e:
         print(f"❌ Erreur calcul CA mensuel: {e}")
+        mark_failed(e)
         import traceback
         traceback.print_exc()
         return {'month': month_year, 'total_revenue': 0}
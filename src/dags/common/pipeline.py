@@ -0,0 +1,106 @@
+import os
+from concurrent.futures import ThreadPoolExecutor, wait
+from .storage import write_table
+from .dtypes import read_csv_planned
+from .clean import CLEANERS, raw_data_path, clean_data_path, report_rejects
+from .enrich import enrich_frames, enriched_data_path
+from .metrics import metrics_from_cube, save_daily_metrics
+from .cube import build_daily_cube, cube_path, cube_total_path, total_rows
+from .rollup import record_daily_sketches
+from .dimensions import load_customer_dimension, load_product_dimension
+from .instrument import instrumented, submit_in_context
+
+# Ecritures des couches intermédiaires, hors du chemin critique
+PERSIST_WORKERS = 2
+_persist_executor = None
+_pending_writes = []
+
+
+def _get_persist_executor():
+    """Pool d'écriture partagé par le processus (créé à la demande)"""
+    global _persist_executor
+    if _persist_executor is None:
+        _persist_executor = ThreadPoolExecutor(max_workers=PERSIST_WORKERS, thread_name_prefix="persist")
+    return _persist_executor
+
+
+def _persist_async(df, path, entity):
+    """
+    Planifie l'écriture d'une couche intermédiaire en arrière-plan
+    (les étapes suivantes ne modifient pas les DataFrames reçus)
+    """
+    future = submit_in_context(_get_persist_executor(), write_table, df, path, entity)
+    _pending_writes.append(future)
+    return future
+
+
+def flush_persistence():
+    """
+    Attend la fin des écritures en arrière-plan et remonte la première erreur
+    """
+    pending = list(_pending_writes)
+    _pending_writes.clear()
+    wait(pending)
+    for future in pending:
+        future.result()
+    return len(pending)
+
+
+@instrumented()
+def run_daily_pipeline(date, persist_intermediate=True, wait_for_writes=True):
+    """
+    Enchaîne clean -> enrich -> métriques en mémoire pour une date
+    Les DataFrames passent directement d'une étape à l'autre ; les couches
+    clean/enriched ne sont écrites (en arrière-plan) que si persist_intermediate
+    """
+    print(f"Pipeline en mémoire pour la date: {date}")
+
+    # Dimensions chargées avant toute écriture en arrière-plan de la couche clean
+    customers = load_customer_dimension()
+    products = load_product_dimension(date=date)
+
+    # 1. Nettoyage à partir des fichiers raw
+    cleaned = {}
+    for entity, cleaner in CLEANERS.items():
+        raw_path = raw_data_path(entity, date)
+        if not os.path.exists(raw_path):
+            print(f"Aucune donnée {entity} à nettoyer pour {date}")
+            continue
+        cleaned[entity], rejected, counts = cleaner(read_csv_planned(raw_path, entity, raw=True), return_rejects=True)
+        report_rejects(entity, date, rejected, counts)
+        if persist_intermediate:
+            _persist_async(cleaned[entity], clean_data_path(entity, date), entity)
+        print(f"{entity} nettoyés: {cleaned[entity].shape[0]} lignes")
+
+    if len(cleaned) < len(CLEANERS):
+        missing = [entity for entity in CLEANERS if entity not in cleaned]
+        print(f"Données manquantes pour l'enrichissement: {missing}")
+        if wait_for_writes:
+            flush_persistence()
+        return {}
+
+    # 2. Enrichissement (dimensions sur disque + données du jour en mémoire)
+    enriched = enrich_frames(cleaned['clients'], cleaned['products'], cleaned['orders'],
+                             customers, products, date)
+    if persist_intermediate:
+        for entity, df in enriched.items():
+            _persist_async(df, enriched_data_path(entity, date), entity)
+
+    # 3. Cube quotidien (toujours persisté, relu par les agrégations mensuelles) et métriques
+    cube = build_daily_cube(date, enriched['clients'], enriched['products'], enriched['orders'])
+    _persist_async(cube, cube_path(date), 'daily_cube')
+    _persist_async(total_rows(cube), cube_total_path(date), 'daily_cube')
+    record_daily_sketches(date, enriched['clients'], enriched['orders'])
+    daily_metrics = metrics_from_cube(date, cube)
+    save_daily_metrics(date, daily_metrics)
+    print(f"✅ Métriques quotidiennes calculées pour {date}")
+
+    if wait_for_writes:
+        flush_persistence()
+
+    return {
+        'cleaned': cleaned,
+        'enriched': enriched,
+        'cube': cube,
+        'metrics': daily_metrics,
+    }
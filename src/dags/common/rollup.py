@@ -0,0 +1,226 @@
+import os
+import sqlite3
+import threading
+import pandas as pd
+from .sketch import build_sketch, sketch_to_bytes, sketch_from_bytes
+
+# Table unique des métriques quotidiennes + agrégats mensuels tenus à jour à chaque ajout
+# + sketches HyperLogLog quotidiens des identifiants clients (sketch.py)
+#   'clients'   : clients du fichier clients du jour
+#   'customers' : clients ayant commandé ce jour
+ROLLUP_DB_PATH = os.path.join("data", "metrics", "rollup.db")
+
+_lock = threading.Lock()
+
+
+def _connect():
+    """Connexion à la base de rollup (tables créées si besoin)"""
+    os.makedirs(os.path.dirname(ROLLUP_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(ROLLUP_DB_PATH, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_metrics (
+            date TEXT PRIMARY KEY,
+            month TEXT NOT NULL,
+            stock_global INTEGER,
+            clients_global INTEGER,
+            daily_revenue REAL NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS monthly_rollup (
+            month TEXT PRIMARY KEY,
+            total_revenue REAL NOT NULL,
+            days_count INTEGER NOT NULL
+        )
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_sketches (
+            date TEXT NOT NULL,
+            name TEXT NOT NULL,
+            registers BLOB NOT NULL,
+            PRIMARY KEY (date, name)
+        )
+        """
+    )
+    return conn
+
+
+def record_daily_metrics(daily_metrics):
+    """
+    Ajoute (ou remplace, en cas de re-calcul) les métriques d'une journée
+    et met à jour l'agrégat de son seul mois
+    """
+    date_str = daily_metrics['date']
+    month = date_str[:7]
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO daily_metrics VALUES (?, ?, ?, ?, ?)",
+                    (
+                        date_str, month,
+                        int(daily_metrics.get('stock_global', 0)),
+                        int(daily_metrics.get('clients_global', 0)),
+                        float(daily_metrics.get('daily_revenue', 0)),
+                    ),
+                )
+                conn.execute(
+                    """
+                    INSERT OR REPLACE INTO monthly_rollup
+                    SELECT month, SUM(daily_revenue), COUNT(*)
+                    FROM daily_metrics WHERE month = ? GROUP BY month
+                    """,
+                    (month,),
+                )
+        finally:
+            conn.close()
+
+
+def record_daily_sketches(date, df_clients, df_orders):
+    """
+    Enregistre les sketches des clients du jour et des clients ayant commandé
+    """
+    sketches = {}
+    if 'customer_id' in df_clients.columns:
+        sketches['clients'] = build_sketch(df_clients['customer_id'].to_numpy())
+    if 'customer_id' in df_orders.columns:
+        sketches['customers'] = build_sketch(df_orders['customer_id'].to_numpy())
+    if not sketches:
+        return
+    date_str = date.strftime('%Y-%m-%d')
+    with _lock:
+        conn = _connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO daily_sketches VALUES (?, ?, ?)",
+                    [(date_str, name, sketch_to_bytes(registers)) for name, registers in sketches.items()],
+                )
+        finally:
+            conn.close()
+
+
+def load_sketches(name, start, end):
+    """Sketches quotidiens {date 'YYYY-MM-DD': registres} entre deux dates incluses"""
+    if not os.path.exists(ROLLUP_DB_PATH):
+        return {}
+    conn = _connect()
+    try:
+        rows = conn.execute(
+            "SELECT date, registers FROM daily_sketches WHERE name = ? AND date >= ? AND date <= ?",
+            (name, start, end),
+        ).fetchall()
+    finally:
+        conn.close()
+    return {date_str: sketch_from_bytes(blob) for date_str, blob in rows}
+
+
+def load_daily_metrics(start=None, end=None):
+    """
+    Métriques quotidiennes entre deux dates 'YYYY-MM-DD' incluses (toutes par défaut)
+    """
+    if not os.path.exists(ROLLUP_DB_PATH):
+        return pd.DataFrame(columns=['date', 'month', 'stock_global', 'clients_global', 'daily_revenue'])
+    conn = _connect()
+    try:
+        return pd.read_sql_query(
+            "SELECT * FROM daily_metrics WHERE date >= ? AND date <= ? ORDER BY date",
+            conn, params=(start or '0000-00-00', end or '9999-99-99'),
+        )
+    finally:
+        conn.close()
+
+
+def daily_metrics_signature():
+    """
+    Signature (nb de jours, dernier rowid) de la table quotidienne :
+    change à chaque ajout ou remplacement d'une journée
+    """
+    if not os.path.exists(ROLLUP_DB_PATH):
+        return (0, 0)
+    conn = _connect()
+    try:
+        count, last = conn.execute("SELECT COUNT(*), MAX(rowid) FROM daily_metrics").fetchone()
+        return (count, last or 0)
+    finally:
+        conn.close()
+
+
+def monthly_rollup(year=None):
+    """Agrégats mensuels (month, total_revenue, days_count), éventuellement d'une année"""
+    if not os.path.exists(ROLLUP_DB_PATH):
+        return pd.DataFrame(columns=['month', 'total_revenue', 'days_count'])
+    conn = _connect()
+    try:
+        return pd.read_sql_query(
+            "SELECT * FROM monthly_rollup WHERE month LIKE ? ORDER BY month",
+            conn, params=(f"{year}-%" if year else "%",),
+        )
+    finally:
+        conn.close()
+
+
+def monthly_totals(month_year):
+    """
+    Métriques mensuelles d'un mois 'YYYY-MM' lues dans l'agrégat, {} si le mois est absent
+    """
+    months = monthly_rollup(month_year[:4])
+    row = months[months['month'] == month_year]
+    if row.empty:
+        return {}
+    total_revenue = float(row['total_revenue'].iloc[0])
+    days_count = int(row['days_count'].iloc[0])
+    return {
+        'month': month_year,
+        'total_revenue': total_revenue,
+        'days_count': days_count,
+        'avg_daily_revenue': total_revenue / days_count if days_count else 0,
+    }
+
+
+def period_rollup(year, period='quarter'):
+    """
+    Agrégats d'une année par période ('month', 'quarter' ou 'year')
+    en un seul groupby vectorisé sur les agrégats mensuels
+    """
+    months = monthly_rollup(year)
+    if months.empty:
+        return pd.DataFrame(columns=[period, 'total_revenue', 'days_count', 'avg_daily_revenue'])
+    month_num = months['month'].str[5:7].astype(int)
+    keys = {
+        'month': months['month'],
+        'quarter': f"{year}-Q" + ((month_num - 1) // 3 + 1).astype(str),
+        'year': pd.Series(str(year), index=months.index),
+    }
+    if period not in keys:
+        raise ValueError(f"Période inconnue: {period}")
+    result = months.groupby(keys[period].rename(period))[['total_revenue', 'days_count']].sum().reset_index()
+    result['avg_daily_revenue'] = result['total_revenue'] / result['days_count']
+    return result
+
+
+def year_to_date(date):
+    """
+    Cumul depuis le 1er janvier jusqu'à `date` incluse :
+    mois complets depuis l'agrégat + jours du mois en cours
+    """
+    month = date.strftime('%Y-%m')
+    months = monthly_rollup(date.year)
+    previous = months[months['month'] < month]
+    current = load_daily_metrics(f"{month}-01", date.strftime('%Y-%m-%d'))
+    total_revenue = float(previous['total_revenue'].sum() + current['daily_revenue'].sum())
+    days_count = int(previous['days_count'].sum() + current.shape[0])
+    return {
+        'year': date.year,
+        'until': date.strftime('%Y-%m-%d'),
+        'total_revenue': total_revenue,
+        'days_count': days_count,
+        'avg_daily_revenue': total_revenue / days_count if days_count else 0,
+    }
@@ -0,0 +1,97 @@
+from collections import Counter, namedtuple
+from functools import lru_cache
+import threading
+import numpy as np
+import pandas as pd
+
+# Règle de validation : `check(df)` renvoie un masque booléen (True = ligne valide)
+# `columns` liste les colonnes requises (None = règle portant sur toutes les colonnes)
+Rule = namedtuple('Rule', ['name', 'columns', 'check'])
+
+# Colonne ajoutée aux lignes rejetées (première règle en échec)
+REJECT_REASON_COLUMN = 'reject_reason'
+
+RULES = {
+    'clients': [
+        Rule('email_sans_arobase', ['email'],
+             lambda df: df['email'].str.contains('@', na=False)),
+        Rule('customer_id_manquant', ['customer_id'],
+             lambda df: df['customer_id'].notna()),
+    ],
+    'products': [
+        Rule('valeur_manquante', None,
+             lambda df: df.notna().all(axis=1)),
+        Rule('stock_negatif', ['stock'],
+             lambda df: df['stock'].isna() | (df['stock'] >= 0)),
+    ],
+    'orders': [
+        Rule('valeur_manquante', None,
+             lambda df: df.notna().all(axis=1)),
+        Rule('quantite_non_positive', ['quantity'],
+             lambda df: df['quantity'].isna() | (df['quantity'] > 0)),
+        Rule('prix_non_positif', ['price'],
+             lambda df: df['price'].isna() | (df['price'] > 0)),
+    ],
+}
+
+# Compteurs cumulés de rejets par (entité, règle) pour le processus
+_reject_counts = Counter()
+_counts_lock = threading.Lock()
+
+
+def register_rule(entity, name, columns, check):
+    """Ajoute une règle au registre d'une entité"""
+    RULES.setdefault(entity, []).append(Rule(name, columns, check))
+    _compile.cache_clear()
+
+
+@lru_cache(maxsize=None)
+def _compile(entity, columns):
+    """
+    Sélectionne une fois pour toutes les règles applicables à un jeu de colonnes
+    """
+    available = set(columns)
+    return tuple(
+        rule for rule in RULES.get(entity, [])
+        if rule.columns is None or all(col in available for col in rule.columns)
+    )
+
+
+def apply_rules(entity, df):
+    """
+    Évalue toutes les règles de l'entité en une seule passe vectorisée
+    Retourne (lignes valides, lignes rejetées avec reject_reason, {règle: nb rejets})
+    """
+    rules = _compile(entity, tuple(df.columns))
+    if not rules or df.empty:
+        return df, df.iloc[0:0].assign(**{REJECT_REASON_COLUMN: pd.Series(dtype=object)}), {}
+
+    # Matrice (lignes x règles) des résultats
+    results = np.column_stack([
+        np.asarray(rule.check(df), dtype=bool) for rule in rules
+    ])
+    valid = results.all(axis=1)
+    failures = (~results).sum(axis=0)
+    counts = {rule.name: int(n) for rule, n in zip(rules, failures)}
+
+    rejected = df[~valid].copy()
+    first_failure = np.argmin(results[~valid], axis=1)
+    rejected[REJECT_REASON_COLUMN] = [rules[i].name for i in first_failure]
+
+    with _counts_lock:
+        for name, n in counts.items():
+            _reject_counts[(entity, name)] += n
+
+    return df[valid], rejected, counts
+
+
+def reject_counts():
+    """Rejets cumulés depuis le démarrage du processus {(entité, règle): nb}"""
+    with _counts_lock:
+        return dict(_reject_counts)
+
+
+def reset_reject_counts():
+    """Remet à zéro les compteurs cumulés"""
+    with _counts_lock:
+        _reject_counts.clear()
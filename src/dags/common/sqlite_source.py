@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import threading
+from urllib.parse import quote
+
+# Connexions en lecture seule aux bases sources (commandes), une par thread et par base
+SQLITE_MMAP_SIZE = 256 * 1024 * 1024   # lecture des pages via mmap (octets)
+SQLITE_CACHE_SIZE_KB = 64 * 1024       # cache de pages par connexion (Kio)
+
+_local = threading.local()
+_indexed = set()
+_index_lock = threading.Lock()
+
+
+def is_wal(db_path):
+    """
+    Vrai si la base est en mode WAL (octets 18-19 de l'en-tête SQLite à 2)
+    """
+    try:
+        with open(db_path, "rb") as f:
+            header = f.read(20)
+    except OSError:
+        return False
+    return len(header) == 20 and header[18] == 2 and header[19] == 2
+
+
+def _open_read_only(db_path):
+    """Ouvre une connexion URI en lecture seule, réglée pour les lectures volumineuses"""
+    uri = f"file:{quote(os.path.abspath(db_path))}?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, timeout=30)
+    conn.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+    conn.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_SIZE_KB}")
+    conn.execute("PRAGMA query_only=ON")
+    return conn
+
+
+def get_read_connection(db_path):
+    """
+    Connexion en lecture seule à db_path, réutilisée par le thread courant
+    (nouvelle connexion après un fork ou si le fichier a été remplacé)
+    """
+    path = os.path.abspath(db_path)
+    if not os.path.exists(path):
+        raise FileNotFoundError(path)
+    connections = getattr(_local, "connections", None)
+    if connections is None or _local.pid != os.getpid():
+        connections = _local.connections = {}
+        _local.pid = os.getpid()
+
+    inode = os.stat(path).st_ino
+    entry = connections.get(path)
+    if entry is not None and entry['inode'] != inode:
+        entry['conn'].close()
+        entry = None
+    if entry is None:
+        entry = {'conn': _open_read_only(path), 'inode': inode, 'wal': is_wal(path)}
+        connections[path] = entry
+    return entry['conn']
+
+
+def connection_info(db_path):
+    """Réglages de la connexion du thread courant (mode WAL, mmap, cache)"""
+    conn = get_read_connection(db_path)
+    return {
+        'wal': _local.connections[os.path.abspath(db_path)]['wal'],
+        'journal_mode': conn.execute("PRAGMA journal_mode").fetchone()[0],
+        'mmap_size': conn.execute("PRAGMA mmap_size").fetchone()[0],
+        'cache_size': conn.execute("PRAGMA cache_size").fetchone()[0],
+    }
+
+
+def close_read_connections():
+    """Ferme les connexions du thread courant"""
+    connections = getattr(_local, "connections", None) or {}
+    for entry in connections.values():
+        entry['conn'].close()
+    connections.clear()
+
+
+def ensure_index(db_path, name, ddl):
+    """
+    Crée un index une seule fois par processus, via une connexion en écriture
+    distincte des connexions de lecture
+    """
+    key = (os.getpid(), os.path.abspath(db_path), name)
+    if key in _indexed:
+        return
+    with _index_lock:
+        if key in _indexed:
+            return
+        conn = sqlite3.connect(db_path, timeout=30)
+        try:
+            conn.execute(ddl)
+            conn.commit()
+        finally:
+            conn.close()
+        _indexed.add(key)
@@ -0,0 +1,72 @@
+import os
+import sqlite3
+from datetime import datetime
+
+# Etat des extractions : watermarks et checksums par source
+STATE_DB_PATH = os.path.join("data", "extraction_state.db")
+
+
+def _connect():
+    """Ouvre la base d'etat (creee a la volee)"""
+    os.makedirs(os.path.dirname(STATE_DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(STATE_DB_PATH, timeout=30)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS extraction_state (
+            source TEXT NOT NULL,
+            key TEXT NOT NULL,
+            watermark TEXT,
+            checksum TEXT,
+            updated_at TEXT NOT NULL,
+            PRIMARY KEY (source, key)
+        )
+    """)
+    return conn
+
+
+def get_state(source, key):
+    """
+    Retourne l'etat enregistre pour (source, key) : {'watermark', 'checksum', 'updated_at'}
+    ou None si la source n'a jamais ete extraite
+    """
+    conn = _connect()
+    try:
+        row = conn.execute(
+            "SELECT watermark, checksum, updated_at FROM extraction_state WHERE source = ? AND key = ?",
+            (source, key),
+        ).fetchone()
+    finally:
+        conn.close()
+    if row is None:
+        return None
+    return {'watermark': row[0], 'checksum': row[1], 'updated_at': row[2]}
+
+
+def set_state(source, key, watermark=None, checksum=None):
+    """
+    Enregistre le watermark et/ou le checksum d'une source apres extraction
+    """
+    conn = _connect()
+    try:
+        with conn:
+            conn.execute(
+                """
+                INSERT INTO extraction_state (source, key, watermark, checksum, updated_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (source, key) DO UPDATE SET
+                    watermark = excluded.watermark,
+                    checksum = excluded.checksum,
+                    updated_at = excluded.updated_at
+                """,
+                (source, key,
+                 None if watermark is None else str(watermark),
+                 checksum,
+                 datetime.now().isoformat(timespec='seconds')),
+            )
+    finally:
+        conn.close()
+
+
+def is_unchanged(source, key, checksum):
+    """Vrai si la source a deja ete extraite avec ce meme checksum"""
+    state = get_state(source, key)
+    return state is not None and checksum is not None and state['checksum'] == checksum
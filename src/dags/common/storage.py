@@ -0,0 +1,223 @@
+import hashlib
+import os
+import threading
+import pandas as pd
+from .dtypes import apply_dtype_plan, read_csv_planned
+from .manifest import is_output_unchanged, record_output
+from .instrument import record_read, record_write, file_size
+
+# Format de stockage des couches clean / enriched / metrics : 'csv' (defaut) ou 'parquet'
+STORAGE_FORMAT = os.environ.get("ECOMMERCE_STORAGE_FORMAT", "csv").lower()
+PARQUET_COMPRESSION = os.environ.get("ECOMMERCE_PARQUET_COMPRESSION", "snappy")
+
+EXTENSIONS = {"csv": ".csv", "parquet": ".parquet"}
+
+# Schemas types appliques a l'ecriture Parquet (colonnes absentes ignorees)
+SCHEMAS = {
+    "clients": {
+        "date": "string",
+        "customer_id": "int64",
+        "firstname": "string",
+        "lastname": "string",
+        "email": "string",
+    },
+    "products": {
+        "date": "string",
+        "product_id": "int64",
+        "product_name": "string",
+        "stock": "int64",
+        "unit_price": "float64",
+        "stock_value": "float64",
+        "stock_status": "string",
+    },
+    "orders": {
+        "order_id": "int64",
+        "order_date": "datetime64[ns]",
+        "customer_id": "int64",
+        "customer_name": "string",
+        "product_id": "int64",
+        "product_name": "string",
+        "quantity": "int64",
+        "price": "float64",
+        "firstname": "string",
+        "lastname": "string",
+        "email": "string",
+        "total_amount": "float64",
+        "stock_at_order": "int64",
+        "stock_status_at_order": "string",
+    },
+    "daily_cube": {
+        "date": "string",
+        "dimension": "string",
+        "key": "int64",
+        "revenue": "float64",
+        "quantity": "int64",
+        "order_count": "int64",
+        "distinct_customers": "int64",
+        "stock": "float64",
+        "clients": "float64",
+    },
+    "daily_metrics": {
+        "date": "string",
+        "stock_global": "int64",
+        "clients_global": "int64",
+        "daily_revenue": "float64",
+    },
+    "monthly_metrics": {
+        "month": "string",
+        "total_revenue": "float64",
+        "days_count": "int64",
+        "avg_daily_revenue": "float64",
+    },
+}
+
+
+def _format(fmt=None):
+    """Format effectif ('csv' ou 'parquet')"""
+    fmt = (fmt or STORAGE_FORMAT).lower()
+    if fmt not in EXTENSIONS:
+        raise ValueError(f"Format de stockage inconnu: {fmt}")
+    return fmt
+
+
+def resolve_path(path, fmt=None):
+    """
+    Adapte l'extension d'un chemin ('.../15.csv') au format de stockage
+    """
+    base, _ = os.path.splitext(path)
+    return base + EXTENSIONS[_format(fmt)]
+
+
+def find_table(path):
+    """
+    Retourne le chemin existant d'une table, dans le format configure
+    ou a defaut dans l'autre format (periode de transition), sinon None
+    """
+    preferred = _format()
+    for fmt in [preferred] + [f for f in EXTENSIONS if f != preferred]:
+        candidate = resolve_path(path, fmt)
+        if os.path.exists(candidate):
+            return candidate
+    return None
+
+
+def table_exists(path):
+    """Vrai si la table existe dans l'un des formats supportes"""
+    return find_table(path) is not None
+
+
+def apply_schema(df, entity):
+    """Applique les types du schema de l'entite aux colonnes presentes"""
+    schema = SCHEMAS.get(entity, {})
+    types = {col: dtype for col, dtype in schema.items() if col in df.columns}
+    if not types:
+        return df
+    df = df.copy()
+    for col, dtype in types.items():
+        if dtype.startswith("datetime"):
+            df[col] = pd.to_datetime(df[col], errors="coerce")
+        elif dtype == "int64" and df[col].isna().any():
+            df[col] = df[col].astype("Int64")
+        else:
+            df[col] = df[col].astype(dtype)
+    return df
+
+
+def content_checksum(df, fmt, entity=None):
+    """
+    Empreinte du contenu d'un DataFrame (colonnes + valeurs), du format et du schema
+    calculee sans serialiser le fichier
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{fmt}|{entity}|{'|'.join(map(str, df.columns))}".encode("utf-8"))
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()
+
+
+def write_table(df, path, entity=None, fmt=None, skip_unchanged=True):
+    """
+    Ecrit un DataFrame dans le format de stockage configure
+    L'ecriture passe par un fichier temporaire renomme atomiquement : un arret en
+    cours d'ecriture ne laisse jamais de fichier tronque au chemin final
+    skip_unchanged => fichier non reecrit si le manifeste indique un contenu identique
+    Retourne le chemin reellement ecrit
+    """
+    fmt = _format(fmt)
+    path = resolve_path(path, fmt)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    checksum = content_checksum(df, fmt, entity)
+    if skip_unchanged and is_output_unchanged(path, checksum):
+        record_write(df.shape[0])
+        return path
+
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        if fmt == "parquet":
+            if entity is not None:
+                df = apply_schema(df, entity)
+            df.to_parquet(tmp_path, index=False, compression=PARQUET_COMPRESSION)
+        else:
+            df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    record_output(path, checksum)
+    record_write(df.shape[0], file_size(path))
+    return path
+
+
+def _parquet_columns(path):
+    """Noms des colonnes d'un fichier Parquet (lecture du seul schema)"""
+    import pyarrow.parquet as pq
+    return pq.ParquetFile(path).schema_arrow.names
+
+
+def read_table(path, columns=None, entity=None):
+    """
+    Lit une table (CSV ou Parquet) avec projection optionnelle des colonnes
+    Les colonnes demandees absentes du fichier sont ignorees
+    Avec `entity`, le plan de types de l'entite est applique (voir dtypes.py)
+    """
+    actual = find_table(path)
+    if actual is None:
+        raise FileNotFoundError(path)
+
+    if actual.endswith(EXTENSIONS["parquet"]):
+        if columns is not None:
+            available = set(_parquet_columns(actual))
+            columns = [col for col in columns if col in available]
+        df = pd.read_parquet(actual, columns=columns)
+        record_read(df.shape[0], file_size(actual))
+        return apply_dtype_plan(df, entity) if entity else df
+
+    if entity is not None:
+        return read_csv_planned(actual, entity, columns=columns)
+    if columns is not None:
+        wanted = set(columns)
+        df = pd.read_csv(actual, usecols=lambda col: col in wanted)
+    else:
+        df = pd.read_csv(actual)
+    record_read(df.shape[0], file_size(actual))
+    return df
+
+
+def list_tables(directory):
+    """
+    Liste les tables d'un dossier {nom sans extension: chemin}
+    (le format configure est prioritaire si les deux coexistent)
+    """
+    if not os.path.isdir(directory):
+        return {}
+    preferred = EXTENSIONS[_format()]
+    tables = {}
+    for name in sorted(os.listdir(directory)):
+        base, ext = os.path.splitext(name)
+        if ext not in EXTENSIONS.values():
+            continue
+        if base not in tables or ext == preferred:
+            tables[base] = os.path.join(directory, name)
+    return tables
@@ -0,0 +1,170 @@
+import threading
+import numpy as np
+import pandas as pd
+from .rollup import load_daily_metrics, daily_metrics_signature, load_sketches
+from .cube import load_daily_cube
+from .clean import clean_data_path
+from .storage import read_table, table_exists
+from .sketch import build_sketch, merge_sketches, estimate_cardinality
+
+# Etat des fenêtres glissantes, reconstruit seulement quand la table de rollup change :
+#   days      : jours disponibles (datetime64[D], triés)
+#   prefix    : sommes préfixées du CA (prefix[i] = CA des i premiers jours)
+#   ids       : identifiants clients de chaque jour, chargés à la demande (mode exact)
+_lock = threading.Lock()
+_state = {'signature': None, 'days': None, 'prefix': None, 'ids': {}}
+
+# Au-delà de ce nombre de jours, les comptages distincts passent par les sketches HyperLogLog
+EXACT_MAX_DAYS = 7
+
+
+def _day(value):
+    """Date (datetime, Timestamp ou 'YYYY-MM-DD') -> datetime64[D]"""
+    return np.datetime64(pd.Timestamp(value).strftime('%Y-%m-%d'), 'D')
+
+
+def _refresh():
+    """Met à jour les sommes préfixées si de nouvelles journées ont été ajoutées"""
+    signature = daily_metrics_signature()
+    if signature != _state['signature']:
+        daily = load_daily_metrics()
+        days = pd.to_datetime(daily['date']).to_numpy().astype('datetime64[D]')
+        revenue = daily['daily_revenue'].to_numpy(dtype='float64')
+        _state.update(
+            signature=signature,
+            days=days,
+            prefix=np.concatenate([[0.0], np.cumsum(revenue)]),
+            ids={},
+        )
+    return _state
+
+
+def _bounds(state, start, end):
+    """Positions [lo, hi) des jours compris entre start et end inclus"""
+    lo = int(np.searchsorted(state['days'], _day(start), side='left'))
+    hi = int(np.searchsorted(state['days'], _day(end), side='right'))
+    return lo, max(lo, hi)
+
+
+def _window_start(date, days):
+    """Premier jour d'une fenêtre de `days` jours se terminant à `date`"""
+    return _day(date) - np.timedelta64(days - 1, 'D')
+
+
+def _load_ids(name, date):
+    """
+    Identifiants d'une journée : 'customers' (clients ayant commandé, cube)
+    ou 'clients' (fichier clients nettoyé)
+    """
+    if name == 'customers':
+        cube = load_daily_cube(date, dimension='customer', columns=['key'])
+        return None if cube is None else cube['key'].to_numpy(dtype='int64')
+    path = clean_data_path('clients', date)
+    if not table_exists(path):
+        return None
+    return read_table(path, columns=['customer_id'])['customer_id'].dropna().to_numpy(dtype='int64')
+
+
+def _day_ids(state, name, day):
+    """Identifiants d'une journée, mis en cache"""
+    key = (name, str(day))
+    if key not in state['ids']:
+        ids = _load_ids(name, pd.Timestamp(str(day)))
+        state['ids'][key] = np.empty(0, dtype='int64') if ids is None else ids
+    return state['ids'][key]
+
+
+def distinct_between(start, end, name='customers', exact=None):
+    """
+    Nombre d'identifiants distincts entre deux dates incluses
+    exact=None : exact si la période couvre au plus EXACT_MAX_DAYS jours, sinon union
+    des sketches quotidiens (les jours sans sketch sont esquissés à la volée)
+    """
+    with _lock:
+        state = _refresh()
+        lo, hi = _bounds(state, start, end)
+        if lo == hi:
+            return 0
+        days = state['days'][lo:hi]
+        if exact is None:
+            exact = (_day(end) - _day(start)).astype(int) + 1 <= EXACT_MAX_DAYS
+        if exact:
+            ids = [_day_ids(state, name, day) for day in days]
+            return int(np.unique(np.concatenate(ids)).size)
+
+        sketches = load_sketches(name, str(days[0]), str(days[-1]))
+        missing = [day for day in days if str(day) not in sketches]
+        unioned = merge_sketches(
+            list(sketches.values()) + [build_sketch(_day_ids(state, name, day)) for day in missing]
+        )
+        return int(round(estimate_cardinality(unioned)))
+
+
+def revenue_between(start, end):
+    """CA entre deux dates incluses (différence de sommes préfixées)"""
+    with _lock:
+        state = _refresh()
+        lo, hi = _bounds(state, start, end)
+        return float(state['prefix'][hi] - state['prefix'][lo])
+
+
+def days_between(start, end):
+    """Nombre de journées disponibles entre deux dates incluses"""
+    with _lock:
+        lo, hi = _bounds(_refresh(), start, end)
+        return hi - lo
+
+
+def distinct_customers_between(start, end, exact=None):
+    """Nombre de clients distincts ayant commandé entre deux dates incluses"""
+    return distinct_between(start, end, 'customers', exact)
+
+
+def distinct_clients_between(start, end, exact=None):
+    """Nombre de clients distincts des fichiers clients entre deux dates incluses"""
+    return distinct_between(start, end, 'clients', exact)
+
+
+def monthly_distinct(month_year, name='customers', exact=False):
+    """Identifiants distincts d'un mois 'YYYY-MM' (union des sketches par défaut)"""
+    start = pd.Timestamp(f"{month_year}-01")
+    return distinct_between(start, start + pd.offsets.MonthEnd(0), name, exact)
+
+
+def rolling_revenue(date, days=7):
+    """CA des `days` derniers jours jusqu'à `date` incluse"""
+    return revenue_between(_window_start(date, days), date)
+
+
+def rolling_distinct_customers(date, days=7, exact=None):
+    """Clients distincts des `days` derniers jours jusqu'à `date` incluse"""
+    return distinct_customers_between(_window_start(date, days), date, exact)
+
+
+def period_over_period(date, days=7):
+    """
+    CA de la fenêtre de `days` jours se terminant à `date` comparé à la fenêtre précédente
+    (days=7 : semaine sur semaine)
+    """
+    current = rolling_revenue(date, days)
+    previous = rolling_revenue(_day(date) - np.timedelta64(days, 'D'), days)
+    return {
+        'current': current,
+        'previous': previous,
+        'delta': current - previous,
+        'delta_pct': 100 * (current - previous) / previous if previous else None,
+    }
+
+
+def window_metrics(date, windows=(7, 28)):
+    """
+    Métriques glissantes d'un tableau de bord pour `date`
+    (CA et clients distincts par fenêtre, évolution semaine sur semaine)
+    """
+    date_str = str(_day(date))
+    metrics = {'date': date_str}
+    for days in windows:
+        metrics[f'revenue_{days}d'] = rolling_revenue(date, days)
+        metrics[f'distinct_customers_{days}d'] = rolling_distinct_customers(date, days)
+    metrics['week_over_week'] = period_over_period(date, 7)
+    return metrics
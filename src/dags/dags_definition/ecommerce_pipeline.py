@@ -0,0 +1,146 @@
+import os
+from datetime import datetime, timedelta
+from airflow import DAG
+from airflow.exceptions import AirflowSkipException
+from airflow.operators.python import PythonOperator, ShortCircuitOperator
+from common.extract import extract_clients, extract_orders, extract_products
+from common.clean import clean_clients_data, clean_products_data, clean_orders_data, raw_data_path
+from common.enrich import enrich_data
+from common.metrics import calculate_daily_metrics, calculate_monthly_revenue
+
+
+def _date(kwargs):
+    """Date logique du run (data_interval_start), sans fuseau horaire"""
+    return datetime.fromisoformat(kwargs["date"]).replace(tzinfo=None)
+
+
+def extraction(**kwargs):
+    print(f"Extraction des {kwargs['entity']}...")
+    date_obj = _date(kwargs)
+    extractors = {
+        "orders": extract_orders,
+        "clients": extract_clients,
+        "products": extract_products,
+    }
+    extractors[kwargs["entity"]](date_obj, incremental=True)
+
+
+def nettoyage(**kwargs):
+    entity = kwargs["entity"]
+    print(f"Nettoyage des {entity}...")
+    date_obj = _date(kwargs)
+    if not os.path.exists(raw_data_path(entity, date_obj)):
+        # Pas de données extraites ce jour : l'enrichissement est sauté
+        raise AirflowSkipException(f"Aucune donnée {entity} extraite pour {date_obj:%Y-%m-%d}")
+    cleaners = {
+        "clients": clean_clients_data,
+        "products": clean_products_data,
+        "orders": clean_orders_data,
+    }
+    # Une erreur de nettoyage fait échouer la tâche (retries), elle n'est pas confondue avec un jour vide
+    cleaners[entity](date_obj, raise_errors=True)
+
+
+def enrichissement(**kwargs):
+    print("Enrichissement...")
+    date_obj = _date(kwargs)
+    if not enrich_data(date_obj):
+        raise ValueError(f"Enrichissement impossible pour {date_obj:%Y-%m-%d}")
+
+
+def metriques_quotidiennes(**kwargs):
+    print("Métriques quotidiennes...")
+    date_obj = _date(kwargs)
+    if not calculate_daily_metrics(date_obj):
+        raise ValueError(f"Métriques quotidiennes impossibles pour {date_obj:%Y-%m-%d}")
+
+
+def fin_de_mois(**kwargs):
+    """Vrai le dernier jour du mois : déclenche l'agrégat mensuel"""
+    date_obj = _date(kwargs)
+    return (date_obj + timedelta(days=1)).month != date_obj.month
+
+
+def metriques_mensuelles(**kwargs):
+    print("Métriques mensuelles...")
+    date_obj = _date(kwargs)
+    month_year = date_obj.strftime("%Y-%m")
+    # Erreur ou aucune métrique quotidienne trouvée : résultat sans jours comptés
+    if not calculate_monthly_revenue(month_year).get("days_count"):
+        raise ValueError(f"Métriques mensuelles impossibles pour {month_year}")
+
+
+default_args = {
+    "owner": "airflow",
+    "retries": 1,
+    "retry_delay": timedelta(minutes=5),
+}
+
+ENTITIES = ["orders", "clients", "products"]
+
+with DAG(
+    dag_id="daily_ecommerce_pipeline",
+    default_args=default_args,
+    description="DAG journalier complet : extraction, nettoyage, enrichissement, métriques",
+    schedule="@daily",
+    start_date=datetime(2024, 5, 1),
+    # Rattrapage de l'historique : plusieurs jours traités en parallèle
+    # (écritures atomiques, dimensions sous verrou, rollup SQLite transactionnel)
+    catchup=True,
+    max_active_runs=16,
+    max_active_tasks=64,
+    tags=["ecommerce", "extract", "clean", "enrich", "metrics"],
+) as dag:
+
+    op_date = {"date": "{{ data_interval_start }}"}
+
+    extract_tasks = {
+        entity: PythonOperator(
+            task_id=f"extract_{entity}",
+            python_callable=extraction,
+            op_kwargs={**op_date, "entity": entity},
+        )
+        for entity in ENTITIES
+    }
+
+    clean_tasks = {
+        entity: PythonOperator(
+            task_id=f"clean_{entity}",
+            python_callable=nettoyage,
+            op_kwargs={**op_date, "entity": entity},
+        )
+        for entity in ENTITIES
+    }
+
+    enrich = PythonOperator(
+        task_id="enrich",
+        python_callable=enrichissement,
+        op_kwargs=op_date,
+    )
+
+    daily_metrics = PythonOperator(
+        task_id="daily_metrics",
+        python_callable=metriques_quotidiennes,
+        op_kwargs=op_date,
+    )
+
+    # depends_on_past : la vérification de fin de mois attend celle de la veille, donc
+    # les métriques de tous les jours précédents, même quand les runs s'exécutent en parallèle
+    month_end = ShortCircuitOperator(
+        task_id="is_month_end",
+        python_callable=fin_de_mois,
+        op_kwargs=op_date,
+        depends_on_past=True,
+        trigger_rule="all_done",
+    )
+
+    monthly_metrics = PythonOperator(
+        task_id="monthly_metrics",
+        python_callable=metriques_mensuelles,
+        op_kwargs=op_date,
+    )
+
+    for entity in ENTITIES:
+        extract_tasks[entity] >> clean_tasks[entity] >> enrich
+
+    enrich >> daily_metrics >> month_end >> monthly_metrics